@@ -0,0 +1,113 @@
+import json
+import operator
+import os
+from collections.abc import Sequence
+
+import numpy as np
+
+# File layout: MAGIC, 8-byte little-endian header size, JSON header, then
+# every array as raw bytes at a 64-byte aligned offset, so arrays can be
+# memory-mapped straight from disk.
+MAGIC = b"IQARRAY1"
+ALIGN = 64
+
+
+def _aligned(n):
+    return -(-n // ALIGN) * ALIGN
+
+
+def write_arrays(path, arrays, meta=None):
+    """Writes a dict of numpy arrays (and a JSON-able meta dict) to `path` atomically."""
+    arrays = {name: np.ascontiguousarray(a) for name, a in arrays.items()}
+    entries = {}
+    offset = 0
+    for name, a in arrays.items():
+        entries[name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": offset}
+        offset = _aligned(offset + a.nbytes)
+    header = json.dumps({"meta": meta or {}, "arrays": entries}).encode("utf-8")
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for name, a in arrays.items():
+            f.seek(data_start + entries[name]["offset"])
+            f.write(a.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp, path)
+
+
+def read_arrays(path, mmap=False):
+    """Returns (arrays, meta).  With mmap=True the arrays are read-only views of the file."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{os.path.basename(path)} is not an array file")
+        size = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(size))
+        data_start = _aligned(len(MAGIC) + 8 + size)
+        raw = None if mmap else f.read()
+
+    arrays = {}
+    for name, e in header["arrays"].items():
+        dtype = np.dtype(e["dtype"])
+        shape = tuple(e["shape"])
+        count = int(np.prod(shape)) if shape else 1
+        if mmap:
+            if count == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=data_start + e["offset"], shape=shape)
+        else:
+            start = data_start + e["offset"] - (len(MAGIC) + 8 + size)
+            arrays[name] = np.frombuffer(raw, dtype=dtype, count=count, offset=start).reshape(shape)
+    return arrays, header["meta"]
+
+
+def pack_strings(table):
+    """Encodes a list of str as (utf-8 blob, byte offsets with len(table) + 1 entries)."""
+    if isinstance(table, StringTable):
+        # Already packed: hand back its arrays without decoding anything
+        return table.blob[table.offsets[0]:table.offsets[-1]], table.offsets - table.offsets[0]
+    encoded = [s.encode("utf-8") for s in table]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def unpack_strings(blob, offsets):
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    return [data[a:b].decode("utf-8") for a, b in zip(bounds, bounds[1:])]
+
+
+class StringTable(Sequence):
+    """Read-only list of str over a pack_strings blob, decoded on access.
+
+    Nothing is copied up front, so a table over memory-mapped arrays costs
+    no heap however many strings it holds, and every process mapping the
+    file shares the same pages.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = operator.index(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        for lo in range(0, len(self), 4096):
+            hi = min(lo + 4096, len(self))
+            yield from unpack_strings(self.blob[self.offsets[lo]:self.offsets[hi]], self.offsets[lo:hi + 1] - self.offsets[lo])
@@ -0,0 +1,143 @@
+import hashlib
+import os
+
+from arrayfile import StringTable, pack_strings, read_arrays, unpack_strings, write_arrays
+from distractors import SimilarityIndex
+from quizset import IdiomBank
+from storage import storage_path
+
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Bump when the loader changes what it extracts, so old entries are ignored
+CACHE_VERSION = 3
+SUFFIX = ".bank"
+INDEX_SUFFIX = ".simidx"
+
+
+def default_cache_dir():
+    return storage_path("banks", cache=True)
+
+
+def file_key(path):
+    h = hashlib.sha1(f"v{CACHE_VERSION}:".encode())
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def save_bank(path, bank, meta=None):
+    idiom_blob, idiom_offsets = pack_strings(bank.idiom_table)
+    meaning_blob, meaning_offsets = pack_strings(bank.meaning_table)
+    write_arrays(path, {
+        "idiom_blob": idiom_blob,
+        "idiom_offsets": idiom_offsets,
+        "idiom_codes": bank.idiom_codes,
+        "meaning_blob": meaning_blob,
+        "meaning_offsets": meaning_offsets,
+        "meaning_codes": bank.meaning_codes,
+    }, dict(meta or {}, report=bank.report))
+
+
+def open_bank(path, mmap=False):
+    """With mmap=True the bank's strings and codes stay in the page cache, shared by every reader."""
+    arrays, meta = read_arrays(path, mmap=mmap)
+    strings = StringTable if mmap else unpack_strings
+    bank = IdiomBank(
+        strings(arrays["idiom_blob"], arrays["idiom_offsets"]),
+        arrays["idiom_codes"],
+        strings(arrays["meaning_blob"], arrays["meaning_offsets"]),
+        arrays["meaning_codes"],
+    )
+    bank.report = meta.get("report")
+    return bank
+
+
+class BankCache:
+    """On-disk cache of parsed idiom banks, keyed by file content hash.
+
+    Entries are evicted least-recently-used first once the directory grows
+    past max_bytes; a hit refreshes the entry's mtime.  A bank's similarity
+    index (for hard distractors) is stored next to it under the same key.
+    """
+
+    def __init__(self, directory=None, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def _path(self, key, suffix=SUFFIX):
+        return os.path.join(self.directory, key + suffix)
+
+    def get(self, key, mmap=False):
+        path = self._path(key)
+        try:
+            bank = open_bank(path, mmap=mmap)
+            os.utime(path)
+        except OSError:
+            return None
+        except (ValueError, KeyError):
+            self.invalidate(key)  # damaged: drop it so the next load rewrites it
+            return None
+        return bank
+
+    def put(self, key, bank):
+        path = self._path(key)
+        if os.path.exists(path):
+            # Keys are content hashes, so the entry already holds this bank
+            os.utime(path)
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        save_bank(path, bank)
+        self.evict()
+
+    def get_index(self, key, size, mmap=False):
+        """The cached index over `size` meanings, or None; a damaged or stale one is removed."""
+        path = self._path(key, INDEX_SUFFIX)
+        try:
+            index = SimilarityIndex.load(path, mmap=mmap)
+            os.utime(path)
+        except OSError:
+            return None
+        except (ValueError, KeyError):
+            index = None
+        if index is None or len(index) != size:
+            self.invalidate(key, (INDEX_SUFFIX,))
+            return None
+        return index
+
+    def put_index(self, key, index):
+        os.makedirs(self.directory, exist_ok=True)
+        index.save(self._path(key, INDEX_SUFFIX))
+        self.evict()
+
+    def invalidate(self, key, suffixes=(SUFFIX, INDEX_SUFFIX)):
+        for suffix in suffixes:
+            try:
+                os.remove(self._path(key, suffix))
+            except OSError:
+                pass  # already gone, or still mapped by a running server on Windows
+
+    def clear(self):
+        for name, _, _ in self._entries():
+            os.remove(os.path.join(self.directory, name))
+
+    def _entries(self):
+        try:
+            names = [n for n in os.listdir(self.directory) if n.endswith((SUFFIX, INDEX_SUFFIX))]
+        except FileNotFoundError:
+            return []
+        entries = []
+        for name in names:
+            st = os.stat(os.path.join(self.directory, name))
+            entries.append((name, st.st_mtime, st.st_size))
+        return entries
+
+    def evict(self):
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        for name, _, size in entries:
+            if total <= self.max_bytes: break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue  # still mapped by a running server on Windows
+            total -= size
@@ -0,0 +1,225 @@
+"""Generates seeded quiz sheets in bulk, for printing whole cohorts at once.
+
+    python batch.py idioms.xlsx --seeds 1-500 --out sheets.csv [--questions 40] [--hard] [--workers 8]
+
+One variant per seed, exactly as the app would generate it for that seed.
+The output format follows the extension: .csv, .jsonl or .xlsx.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from arrayfile import StringTable, pack_strings
+from bankcache import BankCache, file_key
+from distractors import SimilarityIndex
+from ingest import summary
+from loader import load_bank
+from quizgen import generate_quiz
+from quizset import LETTERS, IdiomBank
+
+COLUMNS = ["Seed", "No", "Question", "Option A", "Option B", "Option C", "Option D", "Correct Answer"]
+FORMATS = (".csv", ".jsonl", ".xlsx")
+ALIGN = 64
+
+
+# --- SHARED MEMORY ---
+def share_arrays(arrays):
+    """Copies arrays into one shared memory block; returns (block, spec) for attach_arrays."""
+    layout = []
+    size = 0
+    for name, a in arrays.items():
+        layout.append((name, a.dtype.str, a.shape, size))
+        size = -(-(size + a.nbytes) // ALIGN) * ALIGN
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for (name, dtype, shape, offset), a in zip(layout, arrays.values()):
+        np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)[...] = a
+    return shm, (shm.name, layout)
+
+
+def attach_arrays(spec):
+    name, layout = spec
+    shm = shared_memory.SharedMemory(name=name)
+    arrays = {n: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset) for n, dtype, shape, offset in layout}
+    return shm, arrays
+
+
+def bank_arrays(bank, index=None):
+    idiom_blob, idiom_offsets = pack_strings(bank.idiom_table)
+    meaning_blob, meaning_offsets = pack_strings(bank.meaning_table)
+    arrays = {
+        "idiom_blob": idiom_blob,
+        "idiom_offsets": idiom_offsets,
+        "idiom_codes": bank.idiom_codes,
+        "meaning_blob": meaning_blob,
+        "meaning_offsets": meaning_offsets,
+        "meaning_codes": bank.meaning_codes,
+    }
+    if index is not None:
+        arrays["vectors"] = index.vectors
+        arrays["orders"] = index.orders
+        arrays["keys"] = index.keys
+    return arrays
+
+
+# --- WORKERS ---
+_worker = {}
+
+
+def _init_worker(spec):
+    # The bank is read in place from shared memory, never pickled per task
+    shm, arrays = attach_arrays(spec)
+    _worker["shm"] = shm
+    _worker["bank"] = IdiomBank(
+        StringTable(arrays["idiom_blob"], arrays["idiom_offsets"]),
+        arrays["idiom_codes"],
+        StringTable(arrays["meaning_blob"], arrays["meaning_offsets"]),
+        arrays["meaning_codes"],
+    )
+    _worker["index"] = SimilarityIndex(arrays["vectors"], arrays["orders"], arrays["keys"]) if "vectors" in arrays else None
+
+
+def variant_rows(bank, seed, questions=None, index=None):
+    quiz = generate_quiz(bank, seed=seed, index=index)
+    n = len(quiz) if questions is None else min(questions, len(quiz))
+    return [
+        (seed, i + 1, quiz.question(i), *(quiz.option(i, c) for c in LETTERS), quiz.correct_letter(i))
+        for i in range(n)
+    ]
+
+
+def _render_variant(seed, questions, fmt):
+    rows = variant_rows(_worker["bank"], seed, questions, _worker["index"])
+    if fmt == ".xlsx":
+        return len(rows), rows
+    out = io.StringIO()
+    if fmt == ".csv":
+        csv.writer(out).writerows(rows)
+    else:
+        for row in rows:
+            out.write(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False) + "\n")
+    return len(rows), out.getvalue()
+
+
+# --- OUTPUT ---
+class SheetWriter:
+    """Appends rendered variants to the output file as they arrive."""
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.fmt = fmt
+        if fmt == ".xlsx":
+            from openpyxl import Workbook
+
+            # write_only streams rows to disk instead of building the sheet in memory
+            self.book = Workbook(write_only=True)
+            self.sheet = self.book.create_sheet("Quizzes")
+            self.sheet.append(COLUMNS)
+        else:
+            self.file = open(path, "w", newline="", encoding="utf-8")
+            if fmt == ".csv":
+                csv.writer(self.file).writerow(COLUMNS)
+
+    def write(self, rendered):
+        if self.fmt == ".xlsx":
+            for row in rendered:
+                self.sheet.append(row)
+        else:
+            self.file.write(rendered)
+
+    def close(self):
+        if self.fmt == ".xlsx":
+            self.book.save(self.path)
+        else:
+            self.file.close()
+
+
+def parse_seeds(text):
+    first, _, last = text.partition("-")
+    first = int(first)
+    last = int(last) if last else first
+    if last < first:
+        raise argparse.ArgumentTypeError(f"empty seed range: {text}")
+    return range(first, last + 1)
+
+
+def open_bank_file(path):
+    # Reuses the app's parsed-file cache when the same file was loaded before
+    cache = BankCache()
+    key = file_key(path)
+    bank = cache.get(key)
+    if bank is None:
+        bank = load_bank(path)
+        try:
+            cache.put(key, bank)
+        except OSError:
+            pass
+    return key, bank, cache
+
+
+def run(bank, seeds, out, questions=None, index=None, workers=None):
+    """Writes one variant per seed to `out`, in seed order; returns the number of rows written."""
+    fmt = os.path.splitext(out)[1].lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Output must end in one of {', '.join(FORMATS)}")
+    workers = workers or os.cpu_count() or 1
+    shm, spec = share_arrays(bank_arrays(bank, index))
+    writer = SheetWriter(out, fmt)
+    written = 0
+    try:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(spec,)) as pool:
+            # A bounded window of in-flight variants keeps memory flat and output in seed order
+            seeds = iter(seeds)
+            pending = deque(pool.submit(_render_variant, s, questions, fmt) for s in islice(seeds, 2 * workers))
+            while pending:
+                count, rendered = pending.popleft().result()
+                writer.write(rendered)
+                written += count
+                for s in islice(seeds, 1):
+                    pending.append(pool.submit(_render_variant, s, questions, fmt))
+    finally:
+        writer.close()
+        shm.close()
+        shm.unlink()
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("bank", help="idiom file (.csv, .xlsx or .xls)")
+    parser.add_argument("--seeds", type=parse_seeds, required=True, help="seed or inclusive range, e.g. 1-500")
+    parser.add_argument("--out", required=True, help="output file: .csv, .jsonl or .xlsx")
+    parser.add_argument("--questions", type=int, help="questions per variant (default: the whole bank)")
+    parser.add_argument("--hard", action="store_true", help="use the closest meanings as distractors")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    key, bank, cache = open_bank_file(args.bank)
+    if bank.report:
+        print(summary(bank.report), file=sys.stderr)
+    index = None
+    if args.hard:
+        index = cache.get_index(key, len(bank.meaning_table))
+        if index is None:
+            index = SimilarityIndex.build(bank.meaning_table)
+            try:
+                cache.put_index(key, index)
+            except OSError:
+                pass
+    rows = run(bank, args.seeds, args.out, questions=args.questions, index=index, workers=args.workers)
+    print(f"Wrote {len(args.seeds)} variants ({rows} questions) to {args.out} "
+          f"in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
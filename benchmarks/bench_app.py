@@ -0,0 +1,186 @@
+"""Times QuizApp hot paths headlessly and prints the results as JSON.
+
+    python benchmarks/bench_app.py [--sizes 100 10000 100000 1000000] [--repeat 50] [--out run.json]
+
+Each size gets a synthetic idiom bank.  For every operation the report has
+latency percentiles in milliseconds, the wire messages and bytes it sent,
+the app's own render counters (update calls, controls passed to them and
+controls Flet diffed, render cache hits and misses, navigator cells
+repainted) and its peak traced allocation (tracemalloc, measured on a
+separate run).  The app's history, journal and telemetry go to a
+temporary directory (see headless), never the user's own.
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+import tracemalloc
+
+from headless import make_page
+
+import main as app_module  # noqa: E402
+from loader import load_bank  # noqa: E402
+from quizset import IdiomBank  # noqa: E402
+from telemetry import Telemetry  # noqa: E402
+
+
+_SYLLABLES = [c + v for c in "bdfgklmnprstvwz" for v in "aeiou"]
+_WORDS = [a + b for a in _SYLLABLES for b in _SYLLABLES][:1000]
+
+
+def synthetic_columns(rows, seed=0):
+    # Made-up phrases that ingest.clean_bank keeps in full: every idiom
+    # spells its row number in words, so none repeats another, and the
+    # random meanings never nearly repeat each other
+    rnd = random.Random(seed)
+    idioms, meanings = [], []
+    for i in range(rows):
+        digits = []
+        while i or len(digits) < 2:
+            i, d = divmod(i, len(_WORDS))
+            digits.append(_WORDS[d])
+        idioms.append(" ".join([rnd.choice(_WORDS), *digits, rnd.choice(_WORDS)]))
+        meanings.append(" ".join(rnd.choices(_WORDS, k=6)))
+    return idioms, meanings
+
+
+def write_csv(path, idioms, meanings):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["Idiom", "Meaning", "Notes"])
+        w.writerows((i, m, "") for i, m in zip(idioms, meanings))
+
+
+def percentile(sorted_samples, q):
+    idx = min(len(sorted_samples) - 1, int(round(q / 100 * (len(sorted_samples) - 1))))
+    return sorted_samples[idx]
+
+
+def counters(app):
+    """The app's cumulative render counters."""
+    totals = app.render.totals.values()
+    return {
+        "updates": sum(t["updates"] for t in totals),
+        "controls": sum(t["controls"] for t in totals),
+        "diffed": sum(t["diffed"] for t in totals),
+        "cache_hits": app.render_cache.hits,
+        "cache_misses": app.render_cache.misses,
+        "nav_cells": app.nav_cells_sent,
+    }
+
+
+def measure(conn, fn, repeat, before=None, app=None):
+    samples = []
+    messages = sent = 0
+    counted = counters(app) if app else None
+    for _ in range(repeat):
+        if before: before()
+        m, b = conn.messages, conn.bytes
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+        messages += conn.messages - m
+        sent += conn.bytes - b
+    if app:
+        counted = {k: v - counted[k] for k, v in counters(app).items()}
+
+    if before: before()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples.sort()
+    result = {
+        "runs": repeat,
+        "mean_ms": sum(samples) / len(samples),
+        "p50_ms": percentile(samples, 50),
+        "p90_ms": percentile(samples, 90),
+        "p99_ms": percentile(samples, 99),
+        "max_ms": samples[-1],
+        "messages_per_run": messages / repeat,
+        "bytes_per_run": sent / repeat,
+        "peak_kb": peak / 1024,
+    }
+    if app:
+        result.update({f"{k}_per_run": v / repeat for k, v in counted.items()})
+    return result
+
+
+def bench_size(rows, repeat, workdir):
+    idioms, meanings = synthetic_columns(rows)
+    csv_path = os.path.join(workdir, f"bank_{rows}.csv")
+    write_csv(csv_path, idioms, meanings)
+
+    page, conn = make_page(f"bench-{rows}")
+    app = app_module.QuizApp(page)
+    app.bank = IdiomBank.from_columns(idioms, meanings)
+    app.input_seed.value = "1"
+    heavy = max(3, repeat // 10)
+    rnd = random.Random(rows)
+    results = {}
+
+    loaded = load_bank(csv_path)
+    assert len(loaded) == rows, f"cleaning dropped {rows - len(loaded)} synthetic rows"
+    results["file_load_csv"] = measure(conn, lambda: load_bank(csv_path), heavy)
+    results["_generate_quiz_from_idioms"] = measure(
+        conn, lambda: app._generate_quiz_from_idioms(app.bank, seed=1), heavy)
+    results["setup_game"] = measure(conn, app.setup_game, heavy, app=app)
+    app.scheduler.cancel_all()
+
+    results["load_question"] = measure(conn, lambda: app.load_question(rnd.randrange(app.n)), repeat, app=app)
+
+    def dirty_some():
+        app.current = rnd.randrange(app.n)
+        app.mark_nav_dirty(*(rnd.randrange(app.n) for _ in range(4)))
+    results["update_nav_colors"] = measure(conn, app.update_nav_colors, repeat, before=dirty_some, app=app)
+    results["update_nav_colors_full"] = measure(conn, lambda: app.update_nav_colors(full=True), repeat, app=app)
+
+    def answer_half():
+        app.submitted = False
+        for i in range(0, app.n, 2):
+            app.selected_answers[i] = "A"
+    results["submit_all"] = measure(conn, app.submit_all, heavy, before=answer_half, app=app)
+    app.scheduler.cancel_all()
+
+    # A thousand events per run, to set against the handler latencies above
+    telemetry = Telemetry(path=os.path.join(workdir, "telemetry.jsonl"))
+    results["telemetry_record_x1000"] = measure(
+        conn, lambda: [telemetry.record("bench", 1.0) for _ in range(1000)], repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.sizes:
+            report["results"][str(rows)] = bench_size(rows, args.repeat, workdir)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
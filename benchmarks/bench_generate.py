@@ -0,0 +1,86 @@
+"""Compares the row-by-row quiz generator with the vectorized one.
+
+    python benchmarks/bench_generate.py [--sizes 1000 100000 1000000] [--seed 7]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from quizgen import generate_quiz  # noqa: E402
+from quizset import IdiomBank  # noqa: E402
+
+
+def generate_quiz_loop(raw_df, seed=None):
+    # The original QuizApp._generate_quiz_from_idioms, kept as the reference path
+    idiom_col = next((c for c in raw_df.columns if "idiom" in c.lower()), None)
+    meaning_col = next((c for c in raw_df.columns if "meaning" in c.lower()), None)
+    if not idiom_col or not meaning_col: raise ValueError("Need 'idiom' and 'meaning' cols")
+
+    if seed is not None:
+        shuffled = raw_df.sample(frac=1, random_state=seed).reset_index(drop=True)
+        rng = random.Random(seed)
+    else:
+        shuffled = raw_df.sample(frac=1).reset_index(drop=True)
+        rng = random.Random()
+
+    if len(shuffled) < 4:
+        while len(shuffled) < 4: shuffled = pd.concat([shuffled, shuffled])
+
+    quiz_data = []
+    for i in range(0, len(shuffled), 4):
+        chunk = shuffled.iloc[i : i + 4]
+        if len(chunk) < 4:
+            chunk = pd.concat([chunk, shuffled.iloc[0:4-len(chunk)]])
+
+        if len(chunk) == 4:
+            target = chunk.iloc[0]
+            opts = [{"idiom": target[idiom_col], "meaning": target[meaning_col], "is_correct": True}]
+            for _, r in chunk.iloc[1:].iterrows():
+                opts.append({"idiom": r[idiom_col], "meaning": r[meaning_col], "is_correct": False})
+            rng.shuffle(opts)
+
+            entry = {"Question": f"{target[meaning_col]}", "Correct Answer": ""}
+            for idx, char in enumerate(["A", "B", "C", "D"]):
+                entry[f"Option {char}"] = opts[idx]["idiom"]
+                entry[f"Meaning {char}"] = opts[idx]["meaning"]
+                if opts[idx]["is_correct"]: entry["Correct Answer"] = char
+            quiz_data.append(entry)
+    return pd.DataFrame(quiz_data)
+
+
+def synthetic_bank(rows):
+    return pd.DataFrame({
+        "Idiom": [f"idiom number {i}" for i in range(rows)],
+        "Meaning": [f"meaning of idiom {i}" for i in range(rows)],
+    })
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'loop (s)':>10} {'vector (s)':>11} {'speedup':>8}  same")
+    for rows in args.sizes:
+        bank = synthetic_bank(rows)
+        old, t_old = timed(generate_quiz_loop, bank, seed=args.seed)
+        idiom_bank = IdiomBank.from_frame(bank)
+        new, t_new = timed(generate_quiz, idiom_bank, seed=args.seed)
+        same = old.equals(new.to_frame())
+        print(f"{rows:>10} {t_old:>10.3f} {t_new:>11.3f} {t_old / t_new:>7.0f}x  {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Measures cold start: time to the start screen and to the first loaded file, in fresh interpreters.
+
+    python benchmarks/bench_startup.py [--repeat 10] [--rows 10000] [--out run.json]
+
+Every run is a new Python process, so nothing is warm in sys.modules.  It
+reports milliseconds from process start to `import main`, to the start
+screen being sent, and to the first CSV bank being parsed with each
+loader engine, plus which heavy modules were loaded before the start
+screen could be built (the app warms openpyxl in the background after).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_app import synthetic_columns, write_csv
+
+HEAVY = ["pandas", "openpyxl"]
+
+CHILD = r"""
+import sys, time, json
+t0 = time.perf_counter()
+sys.path.insert(0, {bench_dir!r})
+from headless import make_page
+import main as app_module
+t_import = time.perf_counter()
+heavy = [m for m in {heavy!r} if m in sys.modules]
+page, conn = make_page("startup")
+app = app_module.QuizApp(page)
+t_screen = time.perf_counter()
+from loader import load_bank
+bank = load_bank({csv_path!r}, engine={engine!r})
+t_load = time.perf_counter()
+assert len(bank) == {rows}, "cleaning dropped synthetic rows"
+print(json.dumps({{
+    "import_main_ms": (t_import - t0) * 1000,
+    "start_screen_ms": (t_screen - t0) * 1000,
+    "first_load_ms": (t_load - t0) * 1000,
+    "heavy_after_import": heavy,
+}}))
+"""
+
+
+def run_child(csv_path, engine, home, rows):
+    code = CHILD.format(bench_dir=os.path.dirname(os.path.abspath(__file__)), heavy=HEAVY,
+                        csv_path=csv_path, engine=engine, rows=rows)
+    # A throwaway home keeps the app's history and journal out of the way
+    env = dict(os.environ, HOME=home, FLET_APP_STORAGE_DATA=home)
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+            "rows": args.rows,
+        },
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        csv_path = os.path.join(workdir, "bank.csv")
+        write_csv(csv_path, *synthetic_columns(args.rows))
+        for engine in ("csv", "pandas"):
+            runs = [run_child(csv_path, engine, workdir, args.rows) for _ in range(args.repeat)]
+            summary = {
+                key: statistics.median(r[key] for r in runs)
+                for key in ("import_main_ms", "start_screen_ms", "first_load_ms", "process_ms")
+            }
+            summary["heavy_after_import"] = runs[-1]["heavy_after_import"]
+            report["results"][engine] = summary
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""A real ft.Page wired to an in-process connection instead of a Flutter client.
+
+Controls behave exactly as in the app (diffing, uids, page.update), but the
+wire messages are only counted, so QuizApp can be driven without a GUI.
+
+Importing this module points the app's storage (bank cache, history,
+session journal, telemetry) at a temporary directory, so a benchmark
+never reads or discards the user's own files.
+"""
+import asyncio
+import atexit
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+import flet as ft
+from flet.core.local_connection import LocalConnection
+from flet.core.protocol import (
+    ClientActions,
+    ClientMessage,
+    CommandEncoder,
+    PageCommandResponsePayload,
+    PageCommandsBatchResponsePayload,
+)
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Before main is imported, as bench_startup does for its child processes
+STORAGE = tempfile.mkdtemp(prefix="idiom-quiz-bench-")
+os.environ["HOME"] = os.environ["FLET_APP_STORAGE_DATA"] = STORAGE
+atexit.register(shutil.rmtree, STORAGE, ignore_errors=True)
+
+
+class RecordingConnection(LocalConnection):
+    def __init__(self):
+        super().__init__()
+        self.messages = 0
+        self.bytes = 0
+
+    def _record(self, message):
+        self.messages += 1
+        self.bytes += len(json.dumps(message, cls=CommandEncoder, separators=(",", ":")))
+
+    def send_command(self, session_id, command):
+        result, message = self._process_command(command)
+        if message:
+            self._record(message)
+        return PageCommandResponsePayload(result=result, error="")
+
+    def send_commands(self, session_id, commands):
+        results = []
+        messages = []
+        for command in commands:
+            result, message = self._process_command(command)
+            if command.name in ["add", "get"]:
+                results.append(result)
+            if message:
+                messages.append(message)
+        if messages:
+            self._record(ClientMessage(ClientActions.PAGE_CONTROLS_BATCH, messages))
+        return PageCommandsBatchResponsePayload(results=results, error="")
+
+
+_loop = None
+
+
+def _event_loop():
+    # One background loop shared by every headless page, like the Flet server
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+        threading.Thread(target=_loop.run_forever, daemon=True).start()
+    return _loop
+
+
+def make_page(session_id="headless"):
+    """Returns (page, connection)."""
+    conn = RecordingConnection()
+    return ft.Page(conn, session_id, _event_loop()), conn
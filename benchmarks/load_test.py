@@ -0,0 +1,137 @@
+"""Simulates many concurrent web sessions against one server process and prints JSON.
+
+    python benchmarks/load_test.py [--sessions 300] [--concurrency 32] [--rows 100000] [--answers 20] [--private]
+
+Every session is a QuizApp on a headless page, as Flet's web server would
+create per browser tab, all sharing one BankRegistry; --private instead
+gives each session its own parsed copy of the bank, as before server mode.
+Sessions start a quiz, answer questions and finish, from a thread pool.
+The report has per-action latency percentiles and the traced heap held
+per live session.  Storage is a temporary directory (see headless), so
+--private sessions never touch the user's history or saved quiz.
+
+The sessions above are built directly, not through main.serve, so they
+never meet --max-sessions.  The limit is checked separately: serve()'s
+session factory is handed headless pages past the limit, then a
+disconnect, a reconnect to the full server and a close, and the report
+says whether each was admitted.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from headless import make_page
+
+import main as app_module  # noqa: E402
+from bench_app import synthetic_columns, write_csv  # noqa: E402
+from bankcache import BankCache  # noqa: E402
+from loader import load_bank  # noqa: E402
+from sharedbank import BankRegistry  # noqa: E402
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(round(q / 100 * (len(samples) - 1))))]
+    return {"count": len(samples), "p50_ms": pick(50), "p90_ms": pick(90), "p99_ms": pick(99), "max_ms": samples[-1]}
+
+
+def check_session_limit(registry, limit=3):
+    session = app_module.serve(registry, limit)
+    pages = [make_page(f"limit-{n}")[0] for n in range(limit + 2)]
+    admitted = lambda page: page.on_close is not None
+    for page in pages[:limit + 1]:
+        session(page)
+    over_limit = admitted(pages[limit])
+    pages[0].on_disconnect(None)
+    session(pages[limit + 1])
+    after_disconnect = admitted(pages[limit + 1])
+    pages[0].on_connect(None)
+    # Turned away means the page shows what the refused page above shows
+    shows = lambda page: [getattr(c, "value", None) for c in page.controls]
+    reconnect_when_full = shows(pages[0]) != shows(pages[limit])
+    for page in pages:
+        if admitted(page):
+            page.on_close(None)
+    return {"limit": limit, "admitted_over_limit": over_limit, "admitted_after_disconnect": after_disconnect,
+            "admitted_on_reconnect_when_full": reconnect_when_full}
+
+
+def run(args, workdir):
+    csv_path = os.path.join(workdir, "bank.csv")
+    write_csv(csv_path, *synthetic_columns(args.rows))
+    registry = BankRegistry(cache=BankCache(os.path.join(workdir, "cache")))
+    registry.default_key, bank = registry.load(csv_path)
+    assert len(bank) == args.rows, f"cleaning dropped {args.rows - len(bank)} synthetic rows"
+
+    timings = {}
+
+    def timed(name, fn, *a):
+        start = time.perf_counter()
+        result = fn(*a)
+        timings.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+        return result
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    apps = []
+
+    def session(n):
+        page, _ = make_page(f"load-{n}")
+        if args.private:
+            app = app_module.QuizApp(page)
+            app.history = app.journal = None
+            app.bank = timed("load_bank", load_bank, csv_path)
+        else:
+            app = timed("connect", app_module.QuizApp, page, registry)
+        apps.append(app)
+        app.input_seed.value = str(n)
+        app.input_timer.value = "600"
+        timed("setup_game", app.setup_game)
+        rnd = random.Random(n)
+        for _ in range(args.answers):
+            timed("jump_to", app.jump_to, rnd.randrange(app.n))
+            timed("on_option_click", app.on_option_click, rnd.choice("ABCD"))
+            timed("submit_current", app.submit_current)
+        app.scheduler.cancel_all()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        list(pool.map(session, range(args.sessions)))
+    elapsed = time.perf_counter() - start
+    held = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    for app in apps:
+        app.submit_all()
+        app.scheduler.cancel_all()
+
+    return {
+        "sessions": args.sessions,
+        "shared_bank": not args.private,
+        "elapsed_s": elapsed,
+        "actions_per_s": sum(len(v) for v in timings.values()) / elapsed,
+        "heap_kb_per_session": held / 1024 / args.sessions,
+        "latency": {name: percentiles(v) for name, v in timings.items()},
+        "session_limit": check_session_limit(registry),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--answers", type=int, default=20, help="questions answered per session")
+    parser.add_argument("--private", action="store_true", help="give every session its own copy of the bank")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as workdir:
+        print(json.dumps(run(args, workdir), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import re
+
+import numpy as np
+
+from arrayfile import read_arrays, write_arrays
+
+DIMS = 64            # width of the folded TF-IDF sketch per text
+HASH_BUCKETS = 1 << 18
+TABLES = 4           # independent SimHash orderings
+BITS = 16            # hyperplanes per ordering
+WINDOW = 8           # neighbours taken on each side in every ordering
+QUERY_BATCH = 2048
+BUILD_BATCH = 20000
+
+_PUNCTUATION = re.compile(r"[\W_]+")
+
+
+def _trigram_hashes(texts):
+    """Returns (doc, 64-bit hash) for every character trigram of the padded, lower-cased texts."""
+    padded = [f" {t.lower()} " for t in texts]
+    lengths = np.fromiter((len(t) for t in padded), dtype=np.int64, count=len(padded))
+    codes = np.frombuffer("".join(padded).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    doc = np.repeat(np.arange(len(padded)), lengths)
+    pos = np.arange(len(codes)) - starts[doc]
+    valid = pos <= (lengths[doc] - 3)
+    p = np.nonzero(valid)[0]
+    h = codes[p] * np.uint64(0x9E3779B1) ^ codes[p + 1] * np.uint64(0x85EBCA77) ^ codes[p + 2] * np.uint64(0xC2B2AE3D)
+    h ^= h >> np.uint64(15)
+    return doc[p], h
+
+
+def meaning_key(text):
+    """The text case-folded, with punctuation and spacing reduced to single spaces."""
+    return _PUNCTUATION.sub(" ", text.casefold()).strip()
+
+
+def _meaning_keys(texts):
+    # One code per distinct meaning_key, so "to die" and "To die." share one
+    seen = {}
+    return np.fromiter((seen.setdefault(meaning_key(t), len(seen)) for t in texts), dtype=np.int32, count=len(texts))
+
+
+def _trigram_buckets(texts):
+    doc, h = _trigram_hashes(texts)
+    return doc, (h & np.uint64(HASH_BUCKETS - 1)).astype(np.int64)
+
+
+def _sketch(texts):
+    # Sublinear TF-IDF over hashed trigrams, folded into DIMS signed columns
+    n = len(texts)
+    doc, bucket = _trigram_buckets(texts)
+    pairs, tf = np.unique(doc * HASH_BUCKETS + bucket, return_counts=True)
+    doc, bucket = pairs // HASH_BUCKETS, pairs % HASH_BUCKETS
+    df = np.bincount(bucket, minlength=HASH_BUCKETS)
+    idf = np.log((1 + n) / (1 + df)) + 1
+    weight = (1 + np.log(tf)) * idf[bucket]
+    mixed = (bucket * 2654435761) & 0xFFFFFFFF
+    column = (mixed >> 8) % DIMS
+    weight = np.where(mixed & 1, weight, -weight)
+
+    vectors = np.zeros((n, DIMS), dtype=np.float32)
+    bounds = np.searchsorted(doc, np.arange(0, n + BUILD_BATCH, BUILD_BATCH))
+    for b, (lo, hi) in enumerate(zip(bounds, bounds[1:])):
+        first = b * BUILD_BATCH
+        rows = min(BUILD_BATCH, n - first)
+        if rows <= 0: break
+        flat = np.bincount((doc[lo:hi] - first) * DIMS + column[lo:hi], weights=weight[lo:hi], minlength=rows * DIMS)
+        vectors[first:first + rows] = flat.reshape(rows, DIMS)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.maximum(norms, 1e-9)
+    return vectors
+
+
+class SimilarityIndex:
+    """Approximate nearest neighbours between texts, for picking confusable distractors.
+
+    Texts become hashed character-trigram TF-IDF sketches.  Each of TABLES
+    orderings sorts them by a BITS-bit SimHash code, so similar texts sit
+    close together; a query takes the WINDOW items either side of it in
+    every ordering and reranks those candidates by cosine similarity.
+    Texts with the same meaning_key as the query are never its neighbours.
+    """
+
+    def __init__(self, vectors, orders, keys):
+        self.vectors = vectors
+        self.orders = orders
+        self.keys = keys
+        self.positions = np.empty_like(orders)
+        rows = np.arange(orders.shape[1])
+        for t, order in enumerate(orders):
+            self.positions[t, order] = rows
+
+    @classmethod
+    def build(cls, texts, seed=0):
+        vectors = _sketch(texts)
+        planes = np.random.RandomState(seed).standard_normal((TABLES, DIMS, BITS)).astype(np.float32)
+        weights = (1 << np.arange(BITS)).astype(np.int64)
+        orders = np.empty((TABLES, len(texts)), dtype=np.int32)
+        for t in range(TABLES):
+            codes = ((vectors @ planes[t]) > 0).astype(np.int64) @ weights
+            orders[t] = np.argsort(codes, kind="stable")
+        return cls(vectors, orders, _meaning_keys(texts))
+
+    def __len__(self):
+        return self.orders.shape[1]
+
+    def neighbours(self, items, k=3):
+        """Returns a (len(items), k) array of the closest other items, -1 where there are too few."""
+        items = np.asarray(items, dtype=np.int64)
+        size = len(self)
+        out = np.full((len(items), k), -1, dtype=np.int64)
+        offsets = np.arange(-WINDOW, WINDOW + 1)
+        for lo in range(0, len(items), QUERY_BATCH):
+            q = items[lo:lo + QUERY_BATCH]
+            cand = []
+            for t in range(TABLES):
+                pos = np.clip(self.positions[t, q][:, None] + offsets, 0, size - 1)
+                cand.append(self.orders[t, pos])
+            cand = np.sort(np.concatenate(cand, axis=1), axis=1)
+
+            scores = np.einsum("md,mkd->mk", self.vectors[q], self.vectors[cand])
+            dup = np.zeros_like(cand, dtype=bool)
+            dup[:, 1:] = cand[:, 1:] == cand[:, :-1]
+            scores[dup | (self.keys[cand] == self.keys[q][:, None])] = -np.inf
+
+            top = np.argsort(-scores, axis=1)[:, :k]
+            picked = np.take_along_axis(cand, top, axis=1)
+            picked[np.take_along_axis(scores, top, axis=1) == -np.inf] = -1
+            out[lo:lo + len(q), :picked.shape[1]] = picked
+        return out
+
+    def save(self, path):
+        write_arrays(path, {"vectors": self.vectors, "orders": self.orders, "keys": self.keys})
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        arrays, _ = read_arrays(path, mmap=mmap)
+        return cls(arrays["vectors"], arrays["orders"], arrays["keys"])
@@ -0,0 +1,156 @@
+import os
+import sqlite3
+import threading
+import time
+
+from storage import storage_path
+
+DAY = 86400.0
+FLUSH_EVERY = 20
+FAST_ANSWER = 8.0  # seconds; a correct answer quicker than this counts as easy
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    idiom TEXT PRIMARY KEY,
+    ease REAL NOT NULL,
+    interval REAL NOT NULL,
+    reps INTEGER NOT NULL,
+    lapses INTEGER NOT NULL,
+    due REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_due ON items (due);
+CREATE TABLE IF NOT EXISTS attempts (
+    ts REAL NOT NULL,
+    idiom TEXT NOT NULL,
+    correct INTEGER NOT NULL,
+    latency REAL
+);
+"""
+
+
+def default_history_path():
+    return storage_path("history.sqlite3")
+
+
+def sm2(ease, interval, reps, quality):
+    """One SM-2 step; returns (ease, interval_days, reps)."""
+    ease = max(1.3, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    if quality < 3:
+        return ease, 1.0, 0
+    reps += 1
+    if reps == 1:
+        interval = 1.0
+    elif reps == 2:
+        interval = 6.0
+    else:
+        interval = interval * ease
+    return ease, interval, reps
+
+
+class History:
+    """Per-idiom learner history and an SM-2 review schedule, in SQLite.
+
+    Every answer is appended to `attempts`; `items` holds the schedule, with
+    an index on the due time so picking the next review set reads only the
+    rows it needs, in due order.  Writes are queued and committed in batches.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_history_path()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+        self.lock = threading.Lock()
+        self.pending = []
+
+    def record(self, idiom, correct, latency=None, now=None):
+        # Under the lock, so an answer is never appended to a list flush() just took
+        with self.lock:
+            self.pending.append((idiom, bool(correct), latency, now or time.time()))
+            full = len(self.pending) >= FLUSH_EVERY
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, []
+            if not pending: return
+            with self.db:
+                for idiom, correct, latency, now in pending:
+                    self._apply(idiom, correct, latency, now)
+
+    def _apply(self, idiom, correct, latency, now):
+        self.db.execute(
+            "INSERT INTO attempts (ts, idiom, correct, latency) VALUES (?, ?, ?, ?)",
+            (now, idiom, int(correct), latency))
+        row = self.db.execute(
+            "SELECT ease, interval, reps, lapses FROM items WHERE idiom = ?", (idiom,)).fetchone()
+        ease, interval, reps, lapses = row or (2.5, 0.0, 0, 0)
+        if correct:
+            quality = 5 if latency is not None and latency < FAST_ANSWER else 4
+        else:
+            quality = 1
+            lapses += 1
+        ease, interval, reps = sm2(ease, interval, reps, quality)
+        self.db.execute(
+            "INSERT OR REPLACE INTO items (idiom, ease, interval, reps, lapses, due, last_seen) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (idiom, ease, interval, reps, lapses, now + interval * DAY, now))
+
+    def _known(self, idioms):
+        known = set()
+        idioms = list(idioms)
+        for lo in range(0, len(idioms), 500):
+            chunk = idioms[lo:lo + 500]
+            marks = ",".join("?" * len(chunk))
+            known.update(r[0] for r in self.db.execute(f"SELECT idiom FROM items WHERE idiom IN ({marks})", chunk))
+        return known
+
+    def pick(self, bank, rows_by_idiom, count, rng, now=None):
+        """Chooses `count` bank rows to review: overdue first, then unseen idioms, then the soonest due.
+
+        rows_by_idiom maps idiom text to a bank row; rng is a random.Random
+        used to sample unseen rows from the bank.
+        """
+        now = now or time.time()
+        self.flush()
+        with self.lock:
+            due, upcoming = [], []
+            # Walks the due index in order and stops as soon as it has enough
+            for idiom, when in self.db.execute("SELECT idiom, due FROM items ORDER BY due"):
+                row = rows_by_idiom.get(idiom)
+                if row is None: continue
+                if when <= now:
+                    due.append(row)
+                    if len(due) >= count: break
+                else:
+                    upcoming.append(row)
+                    if len(upcoming) >= count: break
+
+            picked = due[:count]
+            chosen = set(picked)
+            tries = 0
+            while len(picked) < count and tries < 4:
+                rows = rng.sample(range(len(bank)), min(len(bank), 2 * (count - len(picked))))
+                sample = [bank.idiom_table[bank.idiom_codes[r]] for r in rows]
+                known = self._known(sample)
+                for idiom, row in zip(sample, rows):
+                    if idiom in known or row in chosen: continue
+                    picked.append(row)
+                    chosen.add(row)
+                    if len(picked) >= count: break
+                tries += 1
+
+            for row in upcoming:
+                if len(picked) >= count: break
+                if row not in chosen:
+                    picked.append(row)
+                    chosen.add(row)
+        return picked
+
+    def close(self):
+        self.flush()
+        self.db.close()
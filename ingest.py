@@ -0,0 +1,202 @@
+import re
+import unicodedata
+
+import numpy as np
+
+from distractors import _trigram_hashes
+from quizset import IdiomBank, intern_strings
+
+MIN_IDIOMS = 4        # one question needs four different idioms
+MISSING = frozenset(["", "nan", "None"])  # what the readers make of empty cells
+SIGNATURE = 24        # MinHash values per text
+BANDS = 6             # LSH bands of SIGNATURE // BANDS values each
+NEAR_DUP = 0.7        # trigram Jaccard similarity that counts as a near-duplicate
+ESTIMATE_SLACK = 0.15 # candidates whose MinHash estimate is this far below NEAR_DUP are not checked
+MIN_SHINGLES = 8      # shorter texts differ too much per character to call near-duplicates
+EXAMPLES = 5
+
+_SPACE = re.compile(r"\s+")
+
+
+def normalize(text):
+    return _SPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def _shingles(text):
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def minhash(texts, seed=0):
+    """Returns a (len(texts), SIGNATURE) uint32 MinHash signature over each text's character trigrams."""
+    doc, h = _trigram_hashes(texts)
+    starts = np.searchsorted(doc, np.arange(len(texts)))
+    rs = np.random.RandomState(seed)
+    mult = rs.randint(0, 1 << 62, size=SIGNATURE, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    add = rs.randint(0, 1 << 62, size=SIGNATURE, dtype=np.uint64)
+    sig = np.empty((len(texts), SIGNATURE), dtype=np.uint32)
+    permuted = np.empty_like(h)
+    for k in range(SIGNATURE):
+        # Multiply-add mod 2**64, keeping the high word, is one random permutation
+        np.multiply(h, mult[k], out=permuted)
+        permuted += add[k]
+        permuted >>= np.uint64(32)
+        sig[:, k] = np.minimum.reduceat(permuted, starts)
+    return sig
+
+
+def _candidate_pairs(sig):
+    # Within every band, texts with identical values pair up with the
+    # earliest text of their bucket: one sort per band, no pairwise scan
+    n, width = len(sig), SIGNATURE // BANDS
+    found = []
+    for band in range(BANDS):
+        cols = sig[:, band * width:(band + 1) * width].astype(np.uint64)
+        key = cols[:, 0]
+        for c in range(1, width):
+            key = key * np.uint64(0x100000001B3) ^ cols[:, c]
+        order = np.argsort(key, kind="stable")
+        sorted_key = key[order]
+        first = np.ones(n, dtype=bool)
+        first[1:] = sorted_key[1:] != sorted_key[:-1]
+        group = np.maximum.accumulate(np.where(first, np.arange(n), 0))
+        found.append(np.column_stack([order[group][~first], order[~first]]))
+    flat = np.unique(np.concatenate(found) @ np.array([n, 1]))
+    return np.column_stack([flat // n, flat % n])
+
+
+def near_duplicates(texts):
+    """Finds texts that nearly repeat an earlier one.
+
+    Returns (mask, pairs): mask[j] is True when text j has trigram Jaccard
+    similarity of at least NEAR_DUP with some text before it, and pairs
+    lists those (earlier, later) index pairs.  MinHash LSH proposes the
+    candidates, their signatures screen out clear misses, and only the
+    rest are compared exactly.
+    """
+    mask = np.zeros(len(texts), dtype=bool)
+    if len(texts) < 2:
+        return mask, []
+    sig = minhash(texts)
+    cand = _candidate_pairs(sig)
+    agree = np.zeros(len(cand))
+    for lo in range(0, len(cand), 1 << 16):
+        c = cand[lo:lo + (1 << 16)]
+        agree[lo:lo + len(c)] = (sig[c[:, 0]] == sig[c[:, 1]]).mean(axis=1)
+    cand = cand[agree >= NEAR_DUP - ESTIMATE_SLACK]
+
+    pairs = []
+    for i, j in cand.tolist():
+        if mask[j]: continue
+        if similar(texts[i], texts[j]):
+            mask[j] = True
+            pairs.append((i, j))
+    return mask, pairs
+
+
+def similar(a, b):
+    """True when two texts have trigram Jaccard similarity of at least NEAR_DUP."""
+    a, b = _shingles(a), _shingles(b)
+    return min(len(a), len(b)) >= MIN_SHINGLES and len(a & b) >= NEAR_DUP * len(a | b)
+
+
+def similar_pairs(a, b):
+    """similar(a[i], b[i]) for many pairs at once, over lower-cased text."""
+    n = len(a)
+    if not n:
+        return np.zeros(0, dtype=bool)
+
+    def trigrams(texts):
+        # Each text's distinct trigrams as (pair index << 32 | 32-bit hash), sorted
+        doc, h = _trigram_hashes(texts)
+        keys = np.sort(doc.astype(np.uint64) << np.uint64(32) | h & np.uint64(0xFFFFFFFF))
+        return keys[np.concatenate([[True], keys[1:] != keys[:-1]])]
+
+    ta, tb = trigrams(a), trigrams(b)
+    size_a = np.bincount((ta >> np.uint64(32)).astype(np.int64), minlength=n)
+    size_b = np.bincount((tb >> np.uint64(32)).astype(np.int64), minlength=n)
+    shared = np.intersect1d(ta, tb, assume_unique=True)
+    both = np.bincount((shared >> np.uint64(32)).astype(np.int64), minlength=n)
+    return (np.minimum(size_a, size_b) >= MIN_SHINGLES) & (both >= NEAR_DUP * (size_a + size_b - both))
+
+
+def clean_bank(bank, min_idioms=MIN_IDIOMS):
+    """Returns a new IdiomBank fit for quizzes, with `report` describing what was removed.
+
+    Text is NFKC-normalized with runs of whitespace collapsed.  Rows with
+    an empty idiom or meaning are dropped, then rows repeating an earlier
+    idiom (ignoring case).  An idiom that only nearly repeats an earlier
+    one is usually a different idiom ("keep an eye on", "keep an eye
+    out"), so it is dropped only when its meaning is the same or nearly
+    so; otherwise it is just reported.  Repeated or near-identical
+    meanings are only counted: different idioms may well share a meaning.
+    Raises ValueError when fewer than min_idioms rows are left.
+    """
+    # Work on the distinct strings; rows only carry codes into them
+    idiom_text = [normalize(t) for t in bank.idiom_table]
+    meaning_text = [normalize(t) for t in bank.meaning_table]
+    idiom_key, idiom_key_of = intern_strings([t.casefold() for t in idiom_text])
+    meaning_key, meaning_key_of = intern_strings([t.casefold() for t in meaning_text])
+    idiom_empty = np.fromiter((t in MISSING for t in idiom_text), dtype=bool, count=len(idiom_text))
+    meaning_empty = np.fromiter((t in MISSING for t in meaning_text), dtype=bool, count=len(meaning_text))
+
+    empty = idiom_empty[bank.idiom_codes] | meaning_empty[bank.meaning_codes]
+    rows = np.flatnonzero(~empty)
+    row_idiom = idiom_key_of[bank.idiom_codes[rows]]
+    _, first = np.unique(row_idiom, return_index=True)
+    first.sort()
+    unique_rows = rows[first]
+
+    near, pairs = near_duplicates([idiom_key[c] for c in row_idiom[first].tolist()])
+    unique_meaning = meaning_key_of[bank.meaning_codes[unique_rows]]
+    drop = np.zeros(len(unique_rows), dtype=bool)
+    for i, j in pairs:
+        a, b = unique_meaning[i], unique_meaning[j]
+        drop[j] = a == b or similar(meaning_key[a], meaning_key[b])
+    keep = unique_rows[~drop]
+
+    row_meaning = meaning_key_of[bank.meaning_codes[keep]]
+    distinct_meanings, first_meaning = np.unique(row_meaning, return_index=True)
+    first_meaning.sort()
+    near_meaning, _ = near_duplicates([meaning_key[c] for c in row_meaning[first_meaning].tolist()])
+
+    report = {
+        "rows": len(bank),
+        "empty": int(empty.sum()),
+        "duplicate_idioms": len(rows) - len(unique_rows),
+        "near_duplicate_idioms": int(near.sum()),
+        "near_duplicate_dropped": int(drop.sum()),
+        "duplicate_meanings": len(keep) - len(distinct_meanings),
+        "near_duplicate_meanings": int(near_meaning.sum()),
+        "kept": len(keep),
+        "near_duplicate_examples": [
+            [idiom_text[bank.idiom_codes[unique_rows[i]]], idiom_text[bank.idiom_codes[unique_rows[j]]]]
+            for i, j in pairs if not drop[j]
+        ][:EXAMPLES],
+    }
+    if len(keep) < min_idioms:
+        raise ValueError(f"Need at least {min_idioms} distinct idioms with meanings, found {len(keep)}")
+
+    cleaned = IdiomBank.from_columns(
+        [idiom_text[c] for c in bank.idiom_codes[keep].tolist()],
+        [meaning_text[c] for c in bank.meaning_codes[keep].tolist()],
+    )
+    cleaned.report = report
+    return cleaned
+
+
+def summary(report):
+    """One line for the user, e.g. 'Loaded 980 idioms (skipped 5 empty, 12 duplicate rows).'"""
+    skipped = [
+        f"{report[key]} {label}"
+        for key, label in (("empty", "empty"), ("duplicate_idioms", "duplicate"), ("near_duplicate_dropped", "near-duplicate"))
+        if report.get(key)
+    ]
+    text = f"Loaded {report['kept']:,} idioms"
+    if skipped:
+        text += f" (skipped {', '.join(skipped)} rows)"
+    text += "."
+    look_alike = report.get("near_duplicate_idioms", 0) - report.get("near_duplicate_dropped", 0)
+    if look_alike and report.get("near_duplicate_examples"):
+        text += f" {look_alike} kept idioms look alike, e.g. {' / '.join(report['near_duplicate_examples'][0])}."
+    return text
@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from arrayfile import read_arrays, write_arrays
+from quizset import LETTERS
+from storage import storage_path
+
+FSYNC_EVERY = 16        # events between fsyncs
+FSYNC_INTERVAL = 2.0    # ...or seconds, whichever comes first
+SNAPSHOT_EVERY = 256    # events replayed at most on resume
+
+
+def default_journal_dir():
+    return storage_path("session")
+
+
+class SessionJournal:
+    """Append-only journal of the running quiz, so a killed app can resume it.
+
+    Three files: the generated quiz arrays (written once per session), a
+    state snapshot (answers, flags, position, time left) and a JSONL log of
+    events since that snapshot.  Every event is written through to the OS
+    straight away; fsync is batched.  Every SNAPSHOT_EVERY events the state
+    is folded into a new snapshot and the log is truncated, so resuming
+    replays a bounded number of events however long the session ran.
+    Events are absolute (set answer i, set flag i), so replaying one that
+    already made it into the snapshot is harmless.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or default_journal_dir()
+        self.quiz_path = os.path.join(self.directory, "quiz.arr")
+        self.state_path = os.path.join(self.directory, "state.arr")
+        self.log_path = os.path.join(self.directory, "events.jsonl")
+        self.log = None
+        self.state = None
+        self.pending = 0
+        self.unsynced = 0
+        self.last_sync = 0.0
+        self.lock = threading.Lock()
+
+    def exists(self):
+        return os.path.exists(self.quiz_path) and os.path.exists(self.state_path)
+
+    def start(self, quiz, meta, remaining):
+        self.close()
+        os.makedirs(self.directory, exist_ok=True)
+        write_arrays(self.quiz_path, {
+            "opt_idiom": quiz.opt_idiom,
+            "opt_meaning": quiz.opt_meaning,
+            "correct": quiz.correct,
+        }, meta)
+        n = len(quiz)
+        self.state = {
+            "answers": np.full(n, -1, dtype=np.int8),
+            "flags": np.zeros(n, dtype=np.uint8),
+            "current": 0,
+            "remaining": remaining,
+        }
+        self._snapshot()
+
+    def _snapshot(self):
+        st = self.state
+        write_arrays(self.state_path, {"answers": st["answers"], "flags": st["flags"]},
+                     {"current": st["current"], "remaining": st["remaining"]})
+        if self.log is not None:
+            self.log.close()
+        self.log = open(self.log_path, "w", encoding="utf-8")
+        self._sync()
+        self.pending = 0
+
+    def _sync(self):
+        self.log.flush()
+        os.fsync(self.log.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def append(self, kind, index=None, value=None, remaining=None):
+        with self.lock:
+            if self.log is None: return
+            _apply(self.state, kind, index, value, remaining)
+            self.log.write(json.dumps([kind, index, value, remaining], separators=(",", ":")) + "\n")
+            self.log.flush()
+            self.pending += 1
+            self.unsynced += 1
+            if self.pending >= SNAPSHOT_EVERY:
+                self._snapshot()
+            elif self.unsynced >= FSYNC_EVERY or time.monotonic() - self.last_sync >= FSYNC_INTERVAL:
+                self._sync()
+
+    def load(self):
+        """Returns (quiz_arrays, meta, state) with the log replayed on top of the snapshot."""
+        quiz, meta = read_arrays(self.quiz_path)
+        arrays, info = read_arrays(self.state_path)
+        state = {
+            "answers": arrays["answers"].copy(),
+            "flags": arrays["flags"].copy(),
+            "current": info["current"],
+            "remaining": info["remaining"],
+        }
+        try:
+            with open(self.log_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        kind, index, value, remaining = json.loads(line)
+                    except ValueError:
+                        break  # torn last line from a crash mid-write
+                    _apply(state, kind, index, value, remaining)
+        except FileNotFoundError:
+            pass
+        return quiz, meta, state
+
+    def resume(self):
+        """Continues journaling a session returned by load()."""
+        _, _, self.state = self.load()
+        self._snapshot()
+
+    def close(self):
+        with self.lock:
+            if self.log is not None:
+                self._sync()
+                self.log.close()
+            self.log = None
+            self.state = None
+
+    def discard(self):
+        self.close()
+        for path in (self.quiz_path, self.state_path, self.log_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def _apply(state, kind, index, value, remaining):
+    if kind == "answer":
+        state["answers"][index] = LETTERS.index(value) if value else -1
+    elif kind == "flag":
+        state["flags"][index] = 1 if value else 0
+    elif kind == "nav":
+        state["current"] = index
+    if remaining is not None:
+        state["remaining"] = remaining
@@ -0,0 +1,124 @@
+import csv
+
+from ingest import clean_bank
+from quizset import BankBuilder, IdiomBank, find_idiom_columns
+
+CHUNK_ROWS = 5000
+# pandas' default missing-value markers; the csv reader turns them into the
+# same "nan" text pandas would, so both readers build identical banks
+NA_VALUES = frozenset([
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+])
+
+
+class LoadCancelled(Exception):
+    pass
+
+
+def _check(cancel):
+    if cancel is not None and cancel.is_set():
+        raise LoadCancelled()
+
+
+def warm_up():
+    """Imports the spreadsheet readers ahead of the first file pick; safe to call from any thread."""
+    import openpyxl  # noqa: F401
+
+
+def _read_csv_plain(path, progress, cancel):
+    # csv module only, so a plain CSV bank never pays for importing pandas
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        rows = csv.reader(f)
+        header = next(rows, None) or ()
+        header = [c if c else f"Unnamed: {i}" for i, c in enumerate(header)]
+        idiom_col, meaning_col = find_idiom_columns(header)
+        ii, mi = header.index(idiom_col), header.index(meaning_col)
+
+        builder = BankBuilder()
+        idioms, meanings = [], []
+        for row in rows:
+            if not row: continue  # blank line
+            idiom = row[ii] if ii < len(row) else ""
+            meaning = row[mi] if mi < len(row) else ""
+            idioms.append("nan" if idiom in NA_VALUES else idiom)
+            meanings.append("nan" if meaning in NA_VALUES else meaning)
+            if len(idioms) == CHUNK_ROWS:
+                _check(cancel)
+                builder.add(idioms, meanings)
+                idioms, meanings = [], []
+                if progress: progress(builder.rows)
+        builder.add(idioms, meanings)
+        if progress: progress(builder.rows)
+    return builder.build()
+
+
+def _read_csv(path, progress, cancel):
+    import pandas as pd
+
+    # Sniff the header, then stream only the two columns we use
+    header = pd.read_csv(path, nrows=0).columns
+    idiom_col, meaning_col = find_idiom_columns(header)
+    usecols = list(dict.fromkeys([idiom_col, meaning_col]))
+
+    builder = BankBuilder()
+    for chunk in pd.read_csv(path, usecols=usecols, dtype=str, chunksize=CHUNK_ROWS):
+        _check(cancel)
+        builder.add(chunk[idiom_col].tolist(), chunk[meaning_col].tolist())
+        if progress: progress(builder.rows)
+    return builder.build()
+
+
+def _read_xlsx(path, progress, cancel):
+    import openpyxl
+
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        header = [str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+        idiom_col, meaning_col = find_idiom_columns(header)
+        ii, mi = header.index(idiom_col), header.index(meaning_col)
+
+        builder = BankBuilder()
+        idioms, meanings = [], []
+        for row in rows:
+            idioms.append(row[ii] if ii < len(row) else None)
+            meanings.append(row[mi] if mi < len(row) else None)
+            if len(idioms) == CHUNK_ROWS:
+                _check(cancel)
+                builder.add(idioms, meanings)
+                idioms, meanings = [], []
+                if progress: progress(builder.rows)
+        builder.add(idioms, meanings)
+        if progress: progress(builder.rows)
+    finally:
+        wb.close()
+    return builder.build()
+
+
+def load_bank(path, progress=None, cancel=None, engine="csv", clean=True):
+    """Parses an idiom file into an IdiomBank.
+
+    Only the idiom and meaning columns are read, in chunks, so wide or very
+    long sheets never sit in memory as a whole DataFrame.  Meant to run off
+    the UI thread: progress(rows) is called as rows are read and `cancel`
+    (a threading.Event) aborts the load with LoadCancelled.  CSV files go
+    through the csv module unless engine="pandas"; pandas and openpyxl are
+    only imported when a file needs them.  Unless clean=False the rows then
+    go through ingest.clean_bank, which may raise ValueError.
+    """
+    lower = path.lower()
+    if lower.endswith(".csv"):
+        read = _read_csv if engine == "pandas" else _read_csv_plain
+        bank = read(path, progress, cancel)
+    elif lower.endswith(".xlsx"):
+        bank = _read_xlsx(path, progress, cancel)
+    else:
+        import pandas as pd
+
+        bank = IdiomBank.from_frame(pd.read_excel(path))
+    _check(cancel)
+    if clean:
+        bank = clean_bank(bank)
+    return bank
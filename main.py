@@ -1,11 +1,35 @@
 import flet as ft
-import pandas as pd
-import random
+import argparse
 import threading
 import time
 import asyncio
+import math
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from bankcache import BankCache, file_key
+from distractors import SimilarityIndex
+from loader import LoadCancelled, load_bank, warm_up
+from history import History
+from ingest import summary
+from journal import SessionJournal
+from quizfile import QUIZ_EXTENSION, answer_bank, bank_hash, load_quiz, save_quiz
+from quizgen import generate_for_targets, generate_quiz
+from quizset import LETTERS, QuizSet, QuizStats
+from render import RenderBatch, RenderCache, batched
+from scheduler import Scheduler
+from search import QuizSearch, SearchIndex
+from shards import ShardManifest, bank_files
+from sharedbank import BankRegistry
+from telemetry import Telemetry, timed
 
 # --- CONFIGURATION & COLORS ---
+NAV_PAGE_SIZE = 100  # navigator cells built at a time
+RENDER_CACHE_SIZE = 1024  # question render models kept
+SEARCH_RESULTS = 20  # matches listed under the review search box
+REVIEW_SIZE = 50  # questions in a spaced-review quiz
+MAX_SESSIONS = 200  # concurrent quiz sessions in web server mode
+
 THEME_COLORS = {
     "light": {
         "bg_main": "#F3F4F6",
@@ -34,30 +58,74 @@ THEME_COLORS = {
 }
 
 class QuizApp:
-    def __init__(self, page: ft.Page):
+    def __init__(self, page: ft.Page, registry=None):
         self.page = page
         self.page.title = "Idiom Master Pro"
         self.page.padding = 0
         self.page.theme_mode = ft.ThemeMode.SYSTEM
         
         # -- State --
-        self.raw_df = None
-        self.quiz_df = None
+        self.bank = None
+        self.bank_key = None
+        self.manifest = None  # set instead of a fixed bank when several files were picked
+        self.bank_cache = BankCache()
+        # Web server mode: banks come from the shared registry, and the
+        # per-learner history and journal stay off since sessions share a disk
+        self.registry = registry
+        self.sim_index = None
+        self.shown_idx = None
+        self.shown_at = 0.0
+        try:
+            self.history = History() if registry is None else None
+        except Exception:
+            self.history = None
+        self.journal = SessionJournal() if registry is None else None
+        self.sim_index_bank = None
+        self.quiz = None
+        self.quiz_meta = {}  # where the quiz came from, for export: bank_hash, seed, settings
+        self.opened_quiz = None  # (made, source) of an opened quiz file, which Start replays
         self.n = 0
         self.current = 0
         self.selected_answers = [] 
         self.temp_selection = None 
         self.review_flags = []
+        self.stats = QuizStats()
         self.timer_seconds = 0
         self.time_limit_val = 0 
-        self.timer_running = False
+        self.timer_deadline = 0.0
         self.submitted = False
-        self.timer_thread = None
+        self.scheduler = Scheduler(page)
+        self.render = RenderBatch(page)
+        self.render_cache = RenderCache(RENDER_CACHE_SIZE)
+        self.telemetry = Telemetry(session=page.session_id)
+        # Option borders per theme: (unanswered, answered and not chosen)
+        self.option_sides = {
+            mode: (ft.BorderSide(1, colors["neutral"]), ft.BorderSide(1, ft.Colors.GREY_400))
+            for mode, colors in THEME_COLORS.items()
+        }
         self.timer_mode = "overall" 
+        self.nav_dirty = set()
+        self.nav_painted_current = 0
+        self.nav_cells_sent = 0  # navigator cells repainted so far, read by bench_app
+        self.nav_page = 0
+        self.nav_pool = []  # navigator cells, reused across pages and runs
+        self.load_executor = ThreadPoolExecutor(max_workers=1)
+        self.load_cancel = None
+        # The next quiz, built while the results dialog is open: (source, settings, future)
+        self.prepare_executor = ThreadPoolExecutor(max_workers=1)
+        self.prepared = None
+        # Review search: strings are indexed once per app (or server) and
+        # each quiz only maps its options onto them, on the index worker
+        self.search_index = SearchIndex() if registry is None else registry.search_index
+        self.bank_search = None
+        self.quiz_search = None  # future of the running quiz's QuizSearch
+        self.index_executor = ThreadPoolExecutor(max_workers=1)
 
         # -- UI References --
         self.file_picker = ft.FilePicker(on_result=self.on_file_picked)
         self.page.overlay.append(self.file_picker)
+        self.export_picker = ft.FilePicker(on_result=self.on_export_picked)
+        self.page.overlay.append(self.export_picker)
         
         # --- Controls ---
         self.lbl_timer = ft.Text("00:00", color=ft.Colors.RED, size=24, weight=ft.FontWeight.BOLD, font_family="Roboto Mono")
@@ -75,6 +143,14 @@ class QuizApp:
             spacing=8,
             run_spacing=8,
         )
+        self.lbl_nav_page = ft.Text("", size=12, color=ft.Colors.GREY)
+        self.btn_nav_prev_page = ft.IconButton(ft.Icons.CHEVRON_LEFT, on_click=lambda _: self.show_nav_page(self.nav_page - 1))
+        self.btn_nav_next_page = ft.IconButton(ft.Icons.CHEVRON_RIGHT, on_click=lambda _: self.show_nav_page(self.nav_page + 1))
+        self.nav_pager = ft.Row(
+            [self.btn_nav_prev_page, self.lbl_nav_page, self.btn_nav_next_page],
+            alignment=ft.MainAxisAlignment.CENTER,
+            visible=False
+        )
 
         self.option_buttons = {}
         self.opts_column = ft.Column(spacing=10)
@@ -86,6 +162,8 @@ class QuizApp:
         self.btn_mark = self._make_bottom_btn("Mark Review", ft.Icons.FLAG_OUTLINED, self.toggle_flag, visible=True, bgcolor=ft.Colors.ORANGE)
         self.btn_check = self._make_bottom_btn("Check Answer", ft.Icons.CHECK_CIRCLE_OUTLINE, self.submit_current, visible=True, bgcolor=ft.Colors.GREEN)
         self.btn_finish = self._make_bottom_btn("Finish Quiz", ft.Icons.DONE_ALL, self.submit_all, visible=True, bgcolor=ft.Colors.RED)
+        # Browsers cannot save to a chosen path, so web sessions go without
+        self.btn_export = self._make_bottom_btn("Export Quiz", ft.Icons.SAVE_ALT, self.export_quiz, visible=registry is None, bgcolor=ft.Colors.TEAL)
         
         self.btn_retry = self._make_bottom_btn("Retry", ft.Icons.REFRESH, self.handle_retry, visible=False, bgcolor=ft.Colors.RED)
         self.btn_new = self._make_bottom_btn("New File", ft.Icons.UPLOAD_FILE, self.handle_new, visible=False, bgcolor=ft.Colors.PURPLE)
@@ -93,12 +171,24 @@ class QuizApp:
         self.btn_exit = self._make_bottom_btn("Exit", ft.Icons.EXIT_TO_APP, lambda e: self.page.window.close(), visible=False, bgcolor=ft.Colors.GREY)
 
         self.controls_running = [self.btn_mark, self.btn_check, self.btn_finish]
-        self.controls_finished = [self.btn_retry, self.btn_new, self.btn_exit]
+        self.input_search = ft.TextField(label="Search idioms and meanings", dense=True, prefix_icon=ft.Icons.SEARCH,
+                                         on_change=self.on_search, visible=False)
+        self.search_results = ft.Column(spacing=0, visible=False)
+
+        self.controls_finished = [self.btn_retry, self.btn_new, self.btn_exit, self.input_search, self.search_results]
 
         self.start_view = ft.Container()
         self.quiz_view = ft.Container()
         
         self.init_ui()
+        # The start screen is up; import the spreadsheet readers while the user picks a file
+        self.load_executor.submit(warm_up)
+
+        if registry is not None and registry.default_key:
+            self.bank_key = registry.default_key
+            self.bank = registry.get(self.bank_key)
+            self.btn_start_existing.visible = True
+            self.render.touch(self.btn_start_existing)
 
     def _get_color(self, key):
         mode = "dark" if self.page.theme_mode == ft.ThemeMode.DARK else "light"
@@ -128,10 +218,24 @@ class QuizApp:
     
     def init_ui(self):
         # --- 1. START SCREEN ---
+        self.lbl_load_status = ft.Text("", color=ft.Colors.GREY)
+        self.load_panel = ft.Row(
+            [
+                ft.ProgressRing(width=20, height=20, stroke_width=2),
+                self.lbl_load_status,
+                ft.TextButton("Cancel", on_click=self.cancel_load)
+            ],
+            alignment=ft.MainAxisAlignment.CENTER,
+            visible=False
+        )
+
         self.input_seed = ft.TextField(label="Seed (Optional)", width=150, text_align=ft.TextAlign.CENTER)
         self.input_timer = ft.TextField(label="Seconds", value="30", width=100, keyboard_type=ft.KeyboardType.NUMBER, text_align=ft.TextAlign.CENTER)
+        self.input_questions = ft.TextField(label="Questions", width=110, keyboard_type=ft.KeyboardType.NUMBER, text_align=ft.TextAlign.CENTER)
         
         self.switch_mode = ft.Switch(label="Per Question Mode", value=False, on_change=self.on_mode_switch_change)
+        self.switch_hard = ft.Switch(label="Hard Distractors", value=False)
+        self.switch_review = ft.Switch(label="Spaced Review (due idioms first)", value=False)
         self.switch_theme_start = ft.Switch(label="Dark Mode", value=False, on_change=self.toggle_theme)
 
         # New button for retrying with the same file
@@ -143,6 +247,14 @@ class QuizApp:
             style=ft.ButtonStyle(bgcolor=ft.Colors.GREEN, color=ft.Colors.WHITE),
             visible=False 
         )
+        self.btn_resume = ft.ElevatedButton(
+            "Resume Quiz",
+            icon=ft.Icons.RESTORE,
+            on_click=self.resume_session,
+            height=50,
+            style=ft.ButtonStyle(bgcolor=ft.Colors.ORANGE, color=ft.Colors.WHITE),
+            visible=self.journal is not None and self.journal.exists()
+        )
 
         self.start_view = ft.Container(
             alignment=ft.alignment.center,
@@ -156,15 +268,26 @@ class QuizApp:
                     ft.Text("Tablet Edition", color=ft.Colors.GREY),
                     ft.Container(height=30),
                     
-                    ft.ElevatedButton(
-                        "Select File (Excel/CSV)",
-                        icon=ft.Icons.UPLOAD_FILE,
-                        on_click=lambda _: self.file_picker.pick_files(allowed_extensions=["csv", "xlsx", "xls"]),
-                        height=50,
-                        style=ft.ButtonStyle(bgcolor=ft.Colors.BLUE, color=ft.Colors.WHITE)
-                    ),
+                    ft.Row([
+                        ft.ElevatedButton(
+                            "Select Files (Excel/CSV/Quiz)",
+                            icon=ft.Icons.UPLOAD_FILE,
+                            on_click=lambda _: self.file_picker.pick_files(allowed_extensions=["csv", "xlsx", "xls", "quiz"], allow_multiple=True),
+                            height=50,
+                            style=ft.ButtonStyle(bgcolor=ft.Colors.BLUE, color=ft.Colors.WHITE)
+                        ),
+                        ft.ElevatedButton(
+                            "Select Folder",
+                            icon=ft.Icons.FOLDER_OPEN,
+                            on_click=lambda _: self.file_picker.get_directory_path(),
+                            height=50,
+                            style=ft.ButtonStyle(bgcolor=ft.Colors.BLUE, color=ft.Colors.WHITE)
+                        ),
+                    ], alignment=ft.MainAxisAlignment.CENTER),
                     
                     self.btn_start_existing,
+                    self.btn_resume,
+                    self.load_panel,
                     
                     ft.Container(height=30),
                     ft.Container(
@@ -172,9 +295,12 @@ class QuizApp:
                         border_radius=15,
                         content=ft.Column([
                             ft.Text("Configuration", weight=ft.FontWeight.BOLD),
-                            ft.Row([self.input_seed, self.input_timer], alignment=ft.MainAxisAlignment.CENTER),
+                            ft.Row([self.input_seed, self.input_timer, self.input_questions], alignment=ft.MainAxisAlignment.CENTER),
                             self.switch_mode,
-                            self.switch_theme_start
+                            self.switch_hard,
+                            self.switch_review,
+                            self.switch_theme_start,
+                            ft.TextButton("Clear File Cache", icon=ft.Icons.DELETE_SWEEP, on_click=self.clear_bank_cache)
                         ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=15)
                     )
                 ]
@@ -226,7 +352,7 @@ class QuizApp:
             content=self.lbl_feedback
         )
 
-        left_panel = ft.Column(
+        self.left_panel = ft.Column(
             expand=2,
             scroll=ft.ScrollMode.AUTO,
             controls=[
@@ -248,6 +374,9 @@ class QuizApp:
             content=ft.Column([
                 ft.Text("Navigator", weight=ft.FontWeight.BOLD),
                 ft.Divider(),
+                self.input_search,
+                self.search_results,
+                self.nav_pager,
                 self.nav_grid,
                 ft.Divider(),
                 self.lbl_stats
@@ -259,7 +388,7 @@ class QuizApp:
             content=ft.Row([
                 ft.Row([self.btn_mark, self.btn_prev, self.btn_check, self.btn_next, self.btn_retry, self.btn_new]),
                 ft.Container(expand=True),
-                ft.Row([self.btn_finish, self.btn_exit])
+                ft.Row([self.btn_export, self.btn_finish, self.btn_exit])
             ])
         )
 
@@ -269,7 +398,7 @@ class QuizApp:
             content=ft.Row(
                 vertical_alignment=ft.CrossAxisAlignment.START,
                 controls=[
-                    left_panel,
+                    self.left_panel,
                     ft.VerticalDivider(width=1, color=ft.Colors.GREY_300),
                     right_panel
                 ]
@@ -291,13 +420,14 @@ class QuizApp:
         self.apply_theme_colors()
 
     # --- THEME & MODE LOGIC ---
+    @batched
     def toggle_theme(self, e):
         val = e.control.value
         self.page.theme_mode = ft.ThemeMode.DARK if val else ft.ThemeMode.LIGHT
         self.switch_theme_start.value = val
         self.switch_theme_quiz.value = val
         self.apply_theme_colors()
-        self.page.update()
+        self.render.touch(self.page)
 
     def on_mode_switch_change(self, e):
         self.timer_mode = "per_question" if e.control.value else "overall"
@@ -318,151 +448,468 @@ class QuizApp:
         self.lbl_timer.color = self._get_color("error")
         self.lbl_feedback.color = text
         
+        self.update_nav_colors(full=True)
         if self.quiz_view.visible:
             self.load_question(self.current)
-        
-        self.update_nav_colors()
 
     # --- GAME LOGIC ---
+    @batched
     def on_file_picked(self, e: ft.FilePickerResultEvent):
-        if not e.files: return
-        file_path = e.files[0].path
-        if not file_path:
+        if e.path:
+            paths = bank_files(e.path)
+            if not paths:
+                self.page.open(ft.SnackBar(ft.Text("No .csv, .xlsx or .xls files in that folder.")))
+                return
+        elif e.files:
+            paths = [f.path for f in e.files]
+        else:
+            return
+        if not all(paths):
              self.page.open(ft.SnackBar(ft.Text("Error: PC cannot read phone file path. Build APK to test.")))
              return
+        quiz_files = [p for p in paths if p.lower().endswith(QUIZ_EXTENSION)]
+        if quiz_files and len(paths) > 1:
+            self.page.open(ft.SnackBar(ft.Text("Open one quiz file at a time.")))
+            return
+
+        # Parse in the background so the start screen stays usable
+        self.cancel_load()
+        self.cancel_prepared()
+        cancel = self.load_cancel = threading.Event()
+        self.lbl_load_status.value = "Reading file..."
+        self.load_panel.visible = True
+        self.btn_start_existing.visible = False
+        self.render.touch(self.page)
+        if quiz_files:
+            self.load_executor.submit(self._load_quiz_file, paths[0], cancel)
+        elif len(paths) == 1:
+            self.load_executor.submit(self._load_file, paths[0], cancel)
+        else:
+            self.load_executor.submit(self._load_shards, paths, cancel)
+
+    def _load_file(self, file_path, cancel):
+        def progress(rows):
+            if cancel.is_set(): return
+            self.lbl_load_status.value = f"Read {rows:,} rows..."
+            self.render.touch(self.lbl_load_status)
+
+        try:
+            # Files seen before skip the spreadsheet parser entirely
+            if self.registry is not None:
+                key, bank = self.registry.load(file_path, progress=progress, cancel=cancel)
+            else:
+                key = file_key(file_path)
+                bank = self.bank_cache.get(key)
+            if bank is None:
+                bank = load_bank(file_path, progress=progress, cancel=cancel)
+                try:
+                    self.bank_cache.put(key, bank)
+                except OSError:
+                    pass
+            if self.switch_hard.value:
+                self.lbl_load_status.value = "Indexing meanings..."
+                self.render.touch(self.lbl_load_status)
+                self._similarity_index(bank, key)
+            error = None
+        except LoadCancelled:
+            return
+        except Exception as ex:
+            bank, key, error = None, None, ex
+        self._finish_load(cancel, error, bank=bank, key=key, start=self._first_quiz(None, bank, key, error))
 
+    def _load_quiz_file(self, file_path, cancel):
+        # An exported quiz starts as is: no spreadsheet, no generation
         try:
-            self.raw_df = pd.read_csv(file_path) if file_path.endswith(".csv") else pd.read_excel(file_path)
-            self.setup_game()
+            quiz, meta = load_quiz(file_path)
+            key, bank = file_key(file_path), answer_bank(quiz)
+            if self.journal is not None:
+                try:
+                    self.bank_cache.put(key, bank)  # the journal resumes from cached banks
+                except OSError:
+                    key = None
+            start = ((key, bank, quiz), {k: meta.get(k) for k in ("bank_hash", "seed", "settings")})
+            error = None
         except Exception as ex:
-            self.page.open(ft.SnackBar(ft.Text(f"Error loading file: {ex}")))
+            bank, key, start, error = None, None, None, ex
+        self._finish_load(cancel, error, bank=bank, key=key, start=start, replay=True)
+
+    def _load_shards(self, paths, cancel):
+        # Only row counts are kept; setup_game reads the rows it samples
+        def progress(done, total):
+            if cancel.is_set(): return
+            self.lbl_load_status.value = f"Indexed {done} of {total} files..."
+            self.render.touch(self.lbl_load_status)
+
+        try:
+            manifest = ShardManifest.build(paths, self.bank_cache, progress=progress, cancel=cancel)
+            error = None
+        except LoadCancelled:
+            return
+        except Exception as ex:
+            manifest, error = None, ex
+        self._finish_load(cancel, error, manifest=manifest, start=self._first_quiz(manifest, None, None, error))
+
+    def _first_quiz(self, manifest, bank, key, error):
+        # Generates the first quiz on the load worker too, so finishing a
+        # load never runs generation on the event loop.  Returns what
+        # _begin_quiz takes, or the setup error for _finish_load to show.
+        if error is not None: return None
+        try:
+            settings = self._quiz_settings()
+            made = self._make_quiz(manifest, bank, key, settings)
+            return made, self._quiz_source(settings)
+        except Exception as ex:
+            return ex
+
+    def _finish_load(self, cancel, error, bank=None, key=None, manifest=None, start=None, replay=False):
+        async def finish():
+            if cancel.is_set(): return
+            self.load_cancel = None
+            with self.render.interaction("load_finished"):
+                self.load_panel.visible = False
+                if error is None:
+                    self.bank, self.bank_key, self.manifest = bank, key, manifest
+                    # An opened quiz file is what Start and Retry play again
+                    self.opened_quiz = start if replay else None
+                    if manifest is not None:
+                        msg = f"Indexed {manifest.total:,} idioms in {len(manifest.shards)} files."
+                    else:
+                        msg = summary(bank.report) if bank.report else None
+                    if msg:
+                        self.page.open(ft.SnackBar(ft.Text(msg)))
+                    if not isinstance(start, Exception):
+                        self._begin_quiz(*start)
+                        return
+                    self.btn_start_existing.visible = True
+                    self.render.touch(self.page)
+                    self.page.open(ft.SnackBar(ft.Text(f"Setup Error: {start}")))
+                    return
+                self.btn_start_existing.visible = self.bank is not None or self.manifest is not None
+                self.render.touch(self.page)
+            self.page.open(ft.SnackBar(ft.Text(f"Error loading file: {error}")))
+        self.page.run_task(finish)
 
+    @batched
+    def cancel_load(self, e=None):
+        if self.load_cancel is None: return
+        self.load_cancel.set()
+        self.load_cancel = None
+        self.load_panel.visible = False
+        self.btn_start_existing.visible = self.bank is not None or self.manifest is not None
+        self.render.touch(self.page)
+
+    def export_quiz(self, e=None):
+        if self.quiz is None: return
+        self.export_picker.save_file(dialog_title="Export Quiz", file_name=f"idiom-quiz{QUIZ_EXTENSION}",
+                                     allowed_extensions=[QUIZ_EXTENSION[1:]])
+
+    def on_export_picked(self, e: ft.FilePickerResultEvent):
+        if not e.path: return
+        path = e.path if e.path.lower().endswith(QUIZ_EXTENSION) else e.path + QUIZ_EXTENSION
+        try:
+            if not self.quiz_meta.get("bank_hash"):
+                self.quiz_meta["bank_hash"] = bank_hash(self.bank)
+            save_quiz(path, self.quiz, self.quiz_meta["bank_hash"], self.quiz_meta.get("seed"),
+                      **(self.quiz_meta.get("settings") or {}))
+            msg = f"Exported {len(self.quiz):,} questions to {path}."
+        except (OSError, ValueError) as ex:
+            msg = f"Could not export quiz: {ex}"
+        self.page.open(ft.SnackBar(ft.Text(msg)))
+
+    def clear_bank_cache(self, e=None):
+        try:
+            self.bank_cache.clear()
+            msg = "File cache cleared."
+        except OSError as ex:
+            msg = f"Could not clear cache: {ex}"
+        self.page.open(ft.SnackBar(ft.Text(msg)))
+
+    @batched
     def setup_game(self):
+        if self.opened_quiz is not None:
+            self._begin_quiz(*self.opened_quiz)
+            return
         try:
-            seed_val = self.input_seed.value.strip()
-            seed = int(seed_val) if seed_val else None
-            
-            if self.raw_df is None:
-                raise ValueError("No file loaded. Please select a file.")
-
-            self.quiz_df = self._generate_quiz_from_idioms(self.raw_df, seed=seed)
-            self.n = len(self.quiz_df)
-            self.selected_answers = [None] * self.n
-            self.review_flags = [False] * self.n
-            self.current = 0
-            self.submitted = False
-            self.temp_selection = None 
-            
-            self.nav_grid.controls.clear()
-            for i in range(self.n):
-                self.nav_grid.controls.append(
-                    ft.Container(
-                        content=ft.Text(str(i+1), weight=ft.FontWeight.BOLD, color=ft.Colors.WHITE),
-                        alignment=ft.alignment.center,
-                        border_radius=5,
-                        on_click=lambda e, x=i: self.jump_to(x),
-                        data=i 
-                    )
-                )
-            
+            settings = self._quiz_settings()
+            prepared = self._take_prepared(settings)
+            if prepared is None:
+                prepared = self._make_quiz(self.manifest, self.bank, self.bank_key, settings)
+            self._begin_quiz(prepared, self._quiz_source(settings))
+        except Exception as ex:
+             self.page.open(ft.SnackBar(ft.Text(f"Setup Error: {ex}")))
+
+    def _quiz_source(self, settings):
+        # Where a generated quiz came from, as exported with it; the bank
+        # hash is worked out on export, from whichever bank is current then
+        seed, limit, hard, review = settings
+        return {"bank_hash": None, "seed": seed, "settings": {"questions": limit, "hard": hard, "review": review}}
+
+    def _begin_quiz(self, made, source):
+        # Starts a (bank_key, bank, quiz) from its first question with the start screen's timer settings
+        self.bank_key, self.bank, self.quiz = made
+        self.quiz_meta = source
+        n = len(self.quiz)
+        try:
+            time_limit = int(self.input_timer.value)
+        except:
+            time_limit = 30
+        
+        if time_limit <= 0:
+            time_limit = 30
+
+        mode = "per_question" if self.switch_mode.value else "overall"
+
+        # Journal the session so it survives the app being killed
+        if self.journal is not None:
             try:
-                self.time_limit_val = int(self.input_timer.value)
-            except:
-                self.time_limit_val = 30
-            
-            if self.time_limit_val <= 0:
-                self.time_limit_val = 30
+                if self.bank_key is None:
+                    raise OSError("bank is not cached")
+                self.journal.start(self.quiz, {"bank_key": self.bank_key, "time_limit": time_limit, "mode": mode,
+                                               "source": self.quiz_meta, "drawn_from": self.bank.drawn_from}, time_limit)
+            except OSError:
+                self.journal.discard()
+        self.btn_resume.visible = False
 
-            self.timer_seconds = self.time_limit_val
-            self.timer_mode = "per_question" if self.switch_mode.value else "overall"
-            self.lbl_mode_display.value = f"Mode: {self.timer_mode.replace('_', ' ').title()}"
-            self.timer_running = True
-            
-            self.start_timer_thread()
+        self._start_quiz(time_limit, mode, [None] * n, [False] * n, 0, time_limit)
 
-            self.start_view.visible = False
-            self.quiz_view.visible = True
-            self.toggle_controls(finished=False)
-            self.apply_theme_colors()
-            
-            self.load_question(0)
-            self.page.update()
+    def _quiz_settings(self):
+        # (seed, question limit, hard distractors, review mode) as set on the start screen
+        seed_val = self.input_seed.value.strip()
+        seed = int(seed_val) if seed_val else None
+
+        limit_val = self.input_questions.value.strip()
+        limit = int(limit_val) if limit_val else None
+        if limit is not None and limit <= 0:
+            raise ValueError("Questions must be a positive number.")
+        return seed, limit, bool(self.switch_hard.value), bool(self.switch_review.value)
+
+    def _make_quiz(self, manifest, bank, bank_key, settings, cancel=None):
+        # Returns (bank_key, bank, quiz); also runs on the prepare worker,
+        # which sets `cancel` to stop between stages once the quiz is stale
+        def check():
+            if cancel is not None and cancel.is_set():
+                raise LoadCancelled()
+
+        seed, limit, hard, review = settings
+        index_key = bank_key
+        if manifest is not None:
+            # Four rows per question, drawn across every file.  Only the
+            # whole set is cached; a smaller sample is drawn again on resume
+            # and its index is not worth a cache entry either.
+            rows = 4 * limit if limit else manifest.total
+            bank_key, bank = manifest.sample(rows, seed)
+            index_key = bank_key if rows >= manifest.total else None
+        if bank is None:
+            raise ValueError("No file loaded. Please select a file.")
+
+        check()
+        index = self._similarity_index(bank, index_key) if hard else None
+        check()
+        if review and self.history is not None:
+            targets = self.history.pick(bank, bank.rows_by_idiom(), REVIEW_SIZE, random.Random(seed))
+            quiz = generate_for_targets(bank, targets, seed=seed, index=index)
+        else:
+            quiz = self._generate_quiz_from_idioms(bank, seed=seed, index=index)
+        if limit is not None:
+            quiz = quiz.head(limit)
+        return bank_key, bank, quiz
+
+    def prepare_next(self):
+        # Speculatively builds the quiz that Start would build with the
+        # current settings, so Retry does not wait for generation
+        self.cancel_prepared()
+        if self.opened_quiz is not None: return
+        try:
+            settings = self._quiz_settings()
+        except ValueError:
+            return
+        source = self.manifest if self.manifest is not None else self.bank
+        if source is None: return
+        cancel = threading.Event()
+        future = self.prepare_executor.submit(self._make_quiz, self.manifest, self.bank, self.bank_key, settings, cancel)
+        self.prepared = (source, settings, future, cancel)
+
+    def cancel_prepared(self):
+        # A quiz already being built stops at its next stage
+        prepared, self.prepared = self.prepared, None
+        if prepared is None: return
+        prepared[3].set()
+        prepared[2].cancel()
+
+    def _take_prepared(self, settings):
+        prepared, self.prepared = self.prepared, None
+        if prepared is None: return None
+        source, prepared_settings, future, cancel = prepared
+        current = self.manifest if self.manifest is not None else self.bank
+        if source is not current or prepared_settings != settings:
+            cancel.set()
+            future.cancel()
+            return None
+        try:
+            # Still running means it is further along than starting over
+            return future.result()
+        except Exception:
+            return None
+
+    def _start_quiz(self, time_limit, mode, answers, flags, current, remaining):
+        self.n = len(self.quiz)
+        self.render_cache.clear()
+        self.selected_answers = answers
+        self.review_flags = flags
+        self.stats = QuizStats.from_answers(answers, self.quiz.correct_letters, flags)
+        self.current = current
+        self.submitted = False
+        self.temp_selection = None 
+        self._show_stats()
+        self.nav_dirty = set()
+        self.nav_painted_current = current
+        self.shown_idx = None
+        self.input_search.value = ""
+        self.search_results.controls.clear()
+        self.quiz_search = self.index_executor.submit(self._quiz_search, self.bank, self.bank_key, self.quiz)
+        
+        self._build_nav_page(current // NAV_PAGE_SIZE)
+
+        self.time_limit_val = time_limit
+        self.timer_mode = mode
+        self.lbl_mode_display.value = f"Mode: {self.timer_mode.replace('_', ' ').title()}"
+        
+        self.scheduler.cancel_all()
+        if mode == "per_question" and answers[current] is not None:
+            # Killed between answering and moving on
+            self._show_time(0)
+            self.scheduler.start("advance", self._advance_after, 1.5)
+        else:
+            self.start_timer(remaining)
+
+        self.start_view.visible = False
+        self.quiz_view.visible = True
+        self.toggle_controls(finished=False)
+        self.apply_theme_colors()
+        
+        self.load_question(current)
+        self.render.touch(self.page)
+
+    @batched
+    def resume_session(self, e=None):
+        try:
+            arrays, meta, state = self.journal.load()
+            bank = self.bank_cache.get(meta["bank_key"])
+            drawn = meta.get("drawn_from")
+            if bank is None and drawn is not None:
+                # A sample of several files: draw the same rows again
+                key, bank = ShardManifest(self.bank_cache, drawn["shards"]).sample(drawn["count"], drawn["seed"])
+                if key != meta["bank_key"]:
+                    bank = None
+            if bank is None:
+                raise ValueError("its idiom file is no longer cached.")
+            self.bank, self.bank_key = bank, meta["bank_key"]
+            self.quiz = QuizSet(bank.idiom_table, bank.meaning_table,
+                                arrays["opt_idiom"], arrays["opt_meaning"], arrays["correct"])
+            self.quiz_meta = meta.get("source", {})
+            self.opened_quiz = None
+            answers = [LETTERS[a] if a >= 0 else None for a in state["answers"].tolist()]
+            flags = [bool(f) for f in state["flags"].tolist()]
+            self.journal.resume()
+            self._start_quiz(meta["time_limit"], meta["mode"], answers, flags, state["current"], state["remaining"])
         except Exception as ex:
-             self.page.open(ft.SnackBar(ft.Text(f"Setup Error: {ex}")))
+            self.journal.discard()
+            self.btn_resume.visible = False
+            self.render.touch(self.btn_resume)
+            self.page.open(ft.SnackBar(ft.Text(f"Could not resume quiz: {ex}")))
 
+    def _journal(self, kind, index=None, value=None):
+        if self.submitted or self.journal is None: return
+        try:
+            self.journal.append(kind, index, value, remaining=self.timer_seconds)
+        except OSError:
+            self.journal.close()  # keep the quiz going without a journal
+
+    @timed
     def load_question(self, idx):
         if not (0 <= idx < self.n): return
         
         # FIX: Reset temp selection when moving to any new question
         if idx != self.current:
             self.temp_selection = None
+        if idx != self.shown_idx:
+            self.shown_idx = idx
+            self.shown_at = time.perf_counter()
+            self._journal("nav", idx)
             
         self.current = idx
         
-        row = self.quiz_df.iloc[idx]
-        self.lbl_qnum.value = f"Question {idx + 1} of {self.n}"
-        self.lbl_question.value = row["Question"]
-        
+        # Texts and styles come from the render cache, so revisiting a
+        # question or switching theme builds no strings or style objects
         committed_ans = self.selected_answers[idx]
-        correct_letter = row["Correct Answer"]
         show_answers = self.submitted or (committed_ans is not None)
-        
-        for char, btn in self.option_buttons.items():
-            btn.text = f"{char}. {row[f'Option {char}']}"
-            btn.style.bgcolor = None
-            btn.style.side = ft.BorderSide(1, self._get_color("neutral"))
-            btn.style.color = self._get_color("text_btn") 
-            btn.disabled = False
+        temp = None if show_answers else self.temp_selection
+        mode = "dark" if self.page.theme_mode == ft.ThemeMode.DARK else "light"
+        qnum, question, buttons, feedback = self.render_cache.get(
+            (idx, committed_ans, show_answers, temp, mode), self._question_model)
+
+        self.lbl_qnum.value = qnum
+        self.lbl_question.value = question
+        for btn, (text, bgcolor, color, side, disabled) in zip(self.option_buttons.values(), buttons):
+            btn.text = text
+            btn.style.bgcolor = bgcolor
+            btn.style.color = color
+            btn.style.side = side
+            btn.disabled = disabled
+
+        if feedback is not None:
+            self.feedback_container.visible = True
+            self.lbl_feedback.value = feedback
+            self.lbl_feedback.color = self._get_color("text")
+        else:
+            self.feedback_container.visible = False
+
+        if idx // NAV_PAGE_SIZE != self.nav_page:
+            self.show_nav_page(idx // NAV_PAGE_SIZE)
+        else:
+            self.update_nav_colors()
+        self.render.touch(self.left_panel)
+
+    def _question_model(self, idx, committed_ans, show_answers, temp, mode):
+        # (qnum text, question text, per-option (text, bgcolor, color, side, disabled), feedback or None)
+        quiz = self.quiz
+        colors = THEME_COLORS[mode]
+        side_open, side_done = self.option_sides[mode]
+        correct_letter = quiz.correct_letter(idx)
 
+        buttons = []
+        for char in LETTERS:
+            text = f"{char}. {quiz.option(idx, char)}"
             if show_answers:
-                btn.disabled = True
                 if char == correct_letter:
-                    btn.style.bgcolor = self._get_color("success")
-                    btn.style.color = ft.Colors.WHITE
-                    btn.text += "  ✅"
-                elif char == committed_ans and char != correct_letter:
-                    btn.style.bgcolor = self._get_color("error")
-                    btn.style.color = ft.Colors.WHITE
-                    btn.text += "  ❌"
+                    buttons.append((text + "  ✅", colors["success"], ft.Colors.WHITE, side_open, True))
+                elif char == committed_ans:
+                    buttons.append((text + "  ❌", colors["error"], ft.Colors.WHITE, side_open, True))
                 else:
-                    btn.style.side = ft.BorderSide(1, ft.Colors.GREY_400) 
-            else:
+                    buttons.append((text, None, colors["text_btn"], side_done, True))
+            elif char == temp:
                 # Visual highlight ONLY for temp selection
-                is_selected = (self.selected_answers[idx] is None) and (char == self.temp_selection)
-                
-                if is_selected:
-                    btn.style.bgcolor = self._get_color("accent")
-                    btn.style.color = ft.Colors.WHITE
+                buttons.append((text, colors["accent"], ft.Colors.WHITE, side_open, False))
+            else:
+                buttons.append((text, None, colors["text_btn"], side_open, False))
 
+        feedback = None
         if show_answers:
-            self.feedback_container.visible = True
             if committed_ans:
-                is_correct = (committed_ans == correct_letter)
-                status_txt = "Correct! 🎉" if is_correct else "Incorrect."
-                status_color = self._get_color("success") if is_correct else self._get_color("error")
+                status_txt = "Correct! 🎉" if committed_ans == correct_letter else "Incorrect."
             else:
                 status_txt = "Not Answered."
-                status_color = self._get_color("warning")
-
-            full_text = f"{status_txt}\n\nDefinitions:\n"
-            for opt in ["A", "B", "C", "D"]:
-                idiom = row[f"Option {opt}"]
-                meaning = row[f"Meaning {opt}"]
-                marker = "➡"
-                if opt == correct_letter:
-                    marker = "✅ ➡"
-                elif opt == committed_ans:
-                    marker = "➡"
-                full_text += f"{opt}: {idiom}\n   {marker} {meaning}\n\n"
-            
-            self.lbl_feedback.value = full_text
-            self.lbl_feedback.color = self._get_color("text")
-        else:
-            self.feedback_container.visible = False
 
-        self.update_nav_colors()
-        self.page.update()
+            parts = [f"{status_txt}\n\nDefinitions:\n"]
+            for opt in LETTERS:
+                marker = "✅ ➡" if opt == correct_letter else "➡"
+                parts.append(f"{opt}: {quiz.option(idx, opt)}\n   {marker} {quiz.meaning(idx, opt)}\n\n")
+            feedback = "".join(parts)
 
+        return f"Question {idx + 1} of {self.n}", quiz.question(idx), tuple(buttons), feedback
+
+    @timed
+    @batched
     def on_option_click(self, char):
         if self.submitted: return
         # Prevent changing if already answered
@@ -472,6 +919,8 @@ class QuizApp:
         self.temp_selection = char
         self.load_question(self.current)
 
+    @timed
+    @batched
     def submit_current(self, e=None, auto=False):
         # Prevent submission if quiz already finished or question already answered
         if self.submitted or self.selected_answers[self.current]:
@@ -496,40 +945,46 @@ class QuizApp:
 
         # Commit the answer (could be None for auto-timeout = not answered)
         self.selected_answers[self.current] = selection_to_commit
+        correct_letter = self.quiz.correct_letter(self.current)
+        self.stats.record_answer(selection_to_commit, correct_letter)
+        self._journal("answer", self.current, selection_to_commit)
+        think = time.perf_counter() - self.shown_at
+        self.telemetry.record("think_time", think * 1000, self.current)
+        if self.history is not None:
+            self.history.record(
+                self.quiz.option(self.current, correct_letter),
+                selection_to_commit == correct_letter,
+                latency=think)
+        self._show_stats()
+        self.mark_nav_dirty(self.current)
 
         if self.timer_mode == "per_question":
             # stop this question's timer
-            self.timer_running = False
+            self.scheduler.cancel("timer")
 
         # Refresh view to show feedback (or "Not Answered." for None)
         self.load_question(self.current)
 
         # In per-question mode, move to next question after a short pause so user sees feedback
         if self.timer_mode == "per_question":
-            def delayed_move():
-                time.sleep(1.5)
-                async def move_next():
-                    self.next_q(None)
-                self.page.run_task(move_next)
-            threading.Thread(target=delayed_move, daemon=True).start()
+            self.scheduler.start("advance", self._advance_after, 1.5)
+
+    async def _advance_after(self, delay):
+        await asyncio.sleep(delay)
+        self.next_q(None)
 
+    @batched
     def next_q(self, e):
         if self.current < self.n - 1:
             self.temp_selection = None
             self.current += 1
             
             if self.timer_mode == "per_question" and not self.submitted:
-                self.timer_seconds = self.time_limit_val
-                self.timer_running = True
-                m, s = divmod(self.timer_seconds, 60)
-                self.lbl_timer.value = f"{m:02d}:{s:02d}"
-                self.lbl_timer.update()
-
-                if self.timer_thread is None or not self.timer_thread.is_alive():
-                    self.start_timer_thread()
+                self.start_timer(self.time_limit_val)
             
             self.load_question(self.current)
 
+    @batched
     def prev_q(self, e):
         if self.timer_mode == "per_question" and not self.submitted:
             self.page.open(ft.SnackBar(ft.Text("Cannot go back in Per-Question Mode.")))
@@ -540,6 +995,7 @@ class QuizApp:
             self.current -= 1
             self.load_question(self.current)
 
+    @batched
     def jump_to(self, idx):
         if self.timer_mode == "per_question" and not self.submitted:
             self.page.open(ft.SnackBar(ft.Text("Navigator locked in Per-Question Mode.")))
@@ -548,53 +1004,181 @@ class QuizApp:
         self.temp_selection = None
         self.load_question(idx)
 
+    def _quiz_search(self, bank, key, quiz):
+        # Runs on the index worker while the quiz is taken
+        search = self.bank_search
+        if search is None or search.bank is not bank:
+            if self.registry is not None and key and self.registry.get(key) is bank:
+                search = self.registry.search(key, bank)
+            else:
+                search = QuizSearch(self.search_index, bank)
+            self.bank_search = search
+        return search.for_quiz(quiz)
+
+    @timed
+    @batched
+    def on_search(self, e=None):
+        results = self.search_results.controls
+        results.clear()
+        query = self.input_search.value or ""
+        if query.strip() and self.quiz_search is not None:
+            if not self.quiz_search.done():
+                results.append(ft.Text("Indexing, try again in a moment...", size=12, color=ft.Colors.GREY))
+            else:
+                search = self.quiz_search.result()
+                questions, rows = search.search(query, SEARCH_RESULTS)
+                for q in questions:
+                    results.append(ft.TextButton(f"{q + 1}. {self.quiz.option(q, self.quiz.correct_letter(q))}",
+                                                 data=q, on_click=self.on_search_result))
+                bank = search.bank
+                for r in rows:
+                    idiom = bank.idiom_table[bank.idiom_codes[r]]
+                    meaning = bank.meaning_table[bank.meaning_codes[r]]
+                    results.append(ft.Text(f"{idiom}: {meaning}", size=12, color=ft.Colors.GREY))
+                if not questions and not rows:
+                    results.append(ft.Text("No matches.", size=12, color=ft.Colors.GREY))
+        self.render.touch(self.search_results)
+
+    def on_search_result(self, e):
+        self.jump_to(e.control.data)
+
+    @batched
     def toggle_flag(self, e):
         if self.submitted: return
         self.review_flags[self.current] = not self.review_flags[self.current]
+        self.stats.record_flag(self.review_flags[self.current])
+        self._journal("flag", self.current, self.review_flags[self.current])
+        self._show_stats()
+        self.mark_nav_dirty(self.current)
         self.update_nav_colors()
-        self.page.update()
-
-    def update_nav_colors(self):
-        for i, box in enumerate(self.nav_grid.controls):
-            bg = self._get_color("neutral")
-            is_reviewed = self.review_flags[i]
-            is_current = (i == self.current)
-            is_answered = (self.selected_answers[i] is not None)
-
-            if self.submitted:
-                if not is_answered:
-                    bg = self._get_color("error")
-                else:
-                    correct = self.quiz_df.iloc[i]["Correct Answer"]
-                    sel = self.selected_answers[i]
-                    bg = self._get_color("success") if sel == correct else self._get_color("error")
-                if is_current: bg = self._get_color("accent")
+
+    def _nav_cell(self):
+        return ft.Container(
+            content=ft.Text(weight=ft.FontWeight.BOLD, color=ft.Colors.WHITE),
+            alignment=ft.alignment.center,
+            border_radius=5,
+            on_click=self.on_nav_click,
+        )
+
+    def on_nav_click(self, e):
+        self.jump_to(e.control.data)
+
+    def _build_nav_page(self, page_no):
+        # Only the cells of one navigator page exist at a time, and they
+        # come from a pool: the grid grows or shrinks by the difference
+        # and kept cells are relabelled in place, so Flet sends only the
+        # labels that changed
+        self.nav_page = page_no
+        start = page_no * NAV_PAGE_SIZE
+        end = min(start + NAV_PAGE_SIZE, self.n)
+        cells = self.nav_grid.controls
+        count = end - start
+        while len(self.nav_pool) < count:
+            self.nav_pool.append(self._nav_cell())
+        del cells[count:]
+        cells.extend(self.nav_pool[len(cells):count])
+        for i, cell in enumerate(cells, start):
+            if cell.data != i:
+                cell.data = i
+                cell.content.value = str(i + 1)
+        self.lbl_nav_page.value = f"{start + 1}-{end} of {self.n}"
+        self.btn_nav_prev_page.disabled = page_no == 0
+        self.btn_nav_next_page.disabled = end >= self.n
+        self.nav_pager.visible = self.n > NAV_PAGE_SIZE
+
+    @batched
+    def show_nav_page(self, page_no):
+        last_page = max(self.n - 1, 0) // NAV_PAGE_SIZE
+        page_no = min(max(page_no, 0), last_page)
+        self._build_nav_page(page_no)
+        self.update_nav_colors(full=True)
+        self.render.touch(self.nav_pager)
+
+    def mark_nav_dirty(self, *indices):
+        self.nav_dirty.update(indices)
+
+    @timed
+    def update_nav_colors(self, full=False):
+        # Only cells marked dirty, plus the old and new current question, are
+        # repainted and sent; full=True repaints the whole grid in one update.
+        cells = self.nav_grid.controls
+        start = self.nav_page * NAV_PAGE_SIZE
+        if full:
+            dirty = range(start, start + len(cells))
+        else:
+            dirty = self.nav_dirty | {self.nav_painted_current, self.current}
+        self.nav_dirty = set()
+        self.nav_painted_current = self.current
+
+        changed = []
+        for i in dirty:
+            if start <= i < start + len(cells):
+                box = cells[i - start]
+                bg = self._nav_color(i)
+                if full or box.bgcolor != bg:
+                    box.bgcolor = bg
+                    changed.append(box)
+
+        self.nav_cells_sent += len(changed)
+        if not changed: return
+        if full:
+            self.render.touch(self.nav_grid)
+        else:
+            self.render.touch(*changed)
+
+    def _nav_color(self, i):
+        correct_letters = self.quiz.correct_letters
+        bg = self._get_color("neutral")
+        is_reviewed = self.review_flags[i]
+        is_current = (i == self.current)
+        is_answered = (self.selected_answers[i] is not None)
+
+        if self.submitted:
+            if not is_answered:
+                bg = self._get_color("error")
             else:
-                if is_answered:
-                    correct = self.quiz_df.iloc[i]["Correct Answer"]
-                    sel = self.selected_answers[i]
-                    bg = self._get_color("success") if sel == correct else self._get_color("error")
-                
-                if is_current:
-                    bg = self._get_color("accent")
-                elif is_reviewed and not is_answered:
-                    bg = self._get_color("warning")
+                sel = self.selected_answers[i]
+                bg = self._get_color("success") if sel == correct_letters[i] else self._get_color("error")
+            if is_current: bg = self._get_color("accent")
+        else:
+            if is_answered:
+                sel = self.selected_answers[i]
+                bg = self._get_color("success") if sel == correct_letters[i] else self._get_color("error")
             
-            box.bgcolor = bg
-        if self.nav_grid.page: self.nav_grid.update()
+            if is_current:
+                bg = self._get_color("accent")
+            elif is_reviewed and not is_answered:
+                bg = self._get_color("warning")
+        return bg
+
+    def _show_stats(self):
+        st = self.stats
+        if self.submitted:
+            self.lbl_stats.value = f"Score: {st.correct} / {st.total}"
+        else:
+            self.lbl_stats.value = f"Score: {st.correct} / {st.attempted} answered  •  {st.marked} marked"
+        self.render.touch(self.lbl_stats)
 
+    @batched
     def submit_all(self, e=None):
         self.submitted = True
-        self.timer_running = False
+        self.scheduler.cancel_all()
+        if self.journal is not None:
+            self.journal.discard()
+        if self.history is not None:
+            self.history.flush()
+        # Written off the UI thread; a failed write only loses this run's numbers
+        self.load_executor.submit(self.telemetry.export)
+        self.prepare_next()
         
-        # Calculate Stats
-        total = self.n
-        attempted = sum(1 for a in self.selected_answers if a is not None)
-        correct = sum(1 for i in range(self.n) if self.selected_answers[i] == self.quiz_df.iloc[i]["Correct Answer"])
-        wrong = attempted - correct
-        marked = sum(self.review_flags)
+        # Stats are kept up to date as answers and flags come in
+        total = self.stats.total
+        attempted = self.stats.attempted
+        correct = self.stats.correct
+        wrong = self.stats.wrong
+        marked = self.stats.marked
         
-        self.lbl_stats.value = f"Score: {correct} / {total}"
+        self._show_stats()
         
         dlg = ft.AlertDialog(
             title=ft.Text("Quiz Results 📊", weight=ft.FontWeight.BOLD),
@@ -613,6 +1197,7 @@ class QuizApp:
         self.page.open(dlg)
         
         self.toggle_controls(finished=True)
+        self.update_nav_colors(full=True)
         self.load_question(self.current)
 
     def toggle_controls(self, finished):
@@ -620,84 +1205,156 @@ class QuizApp:
             btn.visible = not finished
         for btn in self.controls_finished:
             btn.visible = finished
-        self.page.update()
+        self.render.touch(self.page)
 
+    @batched
     def handle_retry(self, e):
+        self.scheduler.cancel_all()
         self.quiz_view.visible = False
         self.start_view.visible = True
         self.btn_start_existing.visible = True
-        self.page.update()
+        self.render.touch(self.page)
     
+    @batched
     def handle_new(self, e):
+        self.scheduler.cancel_all()
+        self.cancel_prepared()
         self.quiz_view.visible = False
         self.start_view.visible = True
         self.btn_start_existing.visible = False
-        self.page.update()
-
-    def start_timer_thread(self):
-        self.timer_running = True
-        def run():
-            while self.timer_running:
-                if self.timer_seconds > 0:
-                    time.sleep(1)
-                    self.timer_seconds -= 1
-                    m, s = divmod(self.timer_seconds, 60)
-                    self.lbl_timer.value = f"{m:02d}:{s:02d}"
-                    self.lbl_timer.update()
-                else:
-                    if self.timer_mode == "overall":
-                        self.timer_running = False
-                        async def finish(): self.submit_all()
-                        self.page.run_task(finish)
-                        break
-                    elif self.timer_mode == "per_question":
-                        # STOP: automatic per-question submit — use auto=True so temp_selection isn't committed
-                        self.timer_running = False
-                        async def auto_submit():
-                            self.submit_current(None, auto=True)
-                        self.page.run_task(auto_submit)
-                        break
-                        
-        self.timer_thread = threading.Thread(target=run, daemon=True)
-        self.timer_thread.start()
-
-    def _generate_quiz_from_idioms(self, raw_df, seed=None):
-        idiom_col = next((c for c in raw_df.columns if "idiom" in c.lower()), None)
-        meaning_col = next((c for c in raw_df.columns if "meaning" in c.lower()), None)
-        if not idiom_col or not meaning_col: raise ValueError("Need 'idiom' and 'meaning' cols")
-
-        if seed is not None:
-            shuffled = raw_df.sample(frac=1, random_state=seed).reset_index(drop=True)
-            rng = random.Random(seed)
-        else:
-            shuffled = raw_df.sample(frac=1).reset_index(drop=True)
-            rng = random.Random()
+        self.render.touch(self.page)
 
-        if len(shuffled) < 4: 
-            while len(shuffled) < 4: shuffled = pd.concat([shuffled, shuffled])
-        
-        quiz_data = []
-        for i in range(0, len(shuffled), 4):
-            chunk = shuffled.iloc[i : i + 4]
-            if len(chunk) < 4:
-                chunk = pd.concat([chunk, shuffled.iloc[0:4-len(chunk)]])
-
-            if len(chunk) == 4:
-                target = chunk.iloc[0]
-                opts = [{"idiom": target[idiom_col], "meaning": target[meaning_col], "is_correct": True}]
-                for _, r in chunk.iloc[1:].iterrows():
-                    opts.append({"idiom": r[idiom_col], "meaning": r[meaning_col], "is_correct": False})
-                rng.shuffle(opts)
-                
-                entry = {"Question": f"{target[meaning_col]}", "Correct Answer": ""}
-                for idx, char in enumerate(["A", "B", "C", "D"]):
-                    entry[f"Option {char}"] = opts[idx]["idiom"]
-                    entry[f"Meaning {char}"] = opts[idx]["meaning"]
-                    if opts[idx]["is_correct"]: entry["Correct Answer"] = char
-                quiz_data.append(entry)
-        return pd.DataFrame(quiz_data)
+    def close(self):
+        # Stops the session's timers and background work when its page goes away
+        self.scheduler.cancel_all()
+        if self.load_cancel is not None:
+            self.load_cancel.set()
+        self.cancel_prepared()
+        for executor in (self.load_executor, self.prepare_executor, self.index_executor):
+            executor.shutdown(wait=False, cancel_futures=True)
+        if self.history is not None:
+            self.history.flush()
+
+    def start_timer(self, seconds):
+        # The countdown runs against a monotonic deadline, so a late tick
+        # never makes the clock drift; restarting replaces the old task.
+        self.timer_deadline = time.monotonic() + seconds
+        self._show_time(seconds)
+        self.scheduler.start("timer", self._run_timer)
+
+    def _show_time(self, seconds):
+        self.timer_seconds = seconds
+        m, s = divmod(seconds, 60)
+        self.lbl_timer.value = f"{m:02d}:{s:02d}"
+        self.render.touch(self.lbl_timer)
+
+    async def _run_timer(self):
+        while True:
+            remaining = self.timer_deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Sleep until the displayed whole second changes
+            await asyncio.sleep(remaining - (math.ceil(remaining) - 1))
+            remaining = max(self.timer_deadline - time.monotonic(), 0)
+            with self.render.interaction("timer_tick"):
+                self._show_time(math.ceil(remaining))
+            if self.timer_seconds % 5 == 0:
+                self._journal("tick")
+
+        if self.timer_mode == "overall":
+            self.submit_all()
+        elif self.timer_mode == "per_question":
+            # automatic per-question submit — use auto=True so temp_selection isn't committed
+            self.submit_current(None, auto=True)
+
+    def _similarity_index(self, bank, key):
+        # Built once per bank: memory first, then the on-disk cache
+        if self.sim_index_bank is bank:
+            return self.sim_index
+        if self.registry is not None and key:
+            self.sim_index, self.sim_index_bank = self.registry.index(key, bank), bank
+            return self.sim_index
+        index = self.bank_cache.get_index(key, len(bank.meaning_table)) if key else None
+        if index is None:
+            index = SimilarityIndex.build(bank.meaning_table)
+            if key:
+                try:
+                    self.bank_cache.put_index(key, index)
+                except OSError:
+                    pass
+        self.sim_index, self.sim_index_bank = index, bank
+        return index
+
+    def _generate_quiz_from_idioms(self, bank, seed=None, index=None):
+        return generate_quiz(bank, seed=seed, index=index)
 
 def main(page: ft.Page):
     QuizApp(page)
 
-ft.app(target=main)
+def serve(registry, max_sessions):
+    # One QuizApp per browser session, all reading the same shared banks
+    sessions = threading.BoundedSemaphore(max_sessions)
+
+    def full(page):
+        page.add(ft.Text("The quiz server is full, please try again in a minute."))
+
+    def session(page: ft.Page):
+        if not sessions.acquire(blocking=False):
+            full(page)
+            return
+        # A closed or refreshed tab only disconnects; Flet closes the session
+        # once it expires, so the slot is given back at disconnect already
+        # and taken again if the same tab reconnects in time.  A tab that
+        # reconnects to a full server is turned away like a new one.
+        slot_lock = threading.Lock()
+        held = [True]
+        refused = [False]
+
+        def release(e=None):
+            with slot_lock:
+                if held[0]:
+                    held[0] = False
+                    sessions.release()
+
+        def reconnect(e):
+            with slot_lock:
+                if held[0] or refused[0]: return
+                if sessions.acquire(blocking=False):
+                    held[0] = True
+                    return
+                refused[0] = True
+            app.close()
+            page.clean()
+            full(page)
+
+        try:
+            app = QuizApp(page, registry=registry)
+        except Exception:
+            release()
+            raise
+
+        def on_close(e):
+            if not refused[0]:
+                app.close()
+            release()
+        page.on_disconnect = release
+        page.on_connect = reconnect
+        page.on_close = on_close
+    return session
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Idiom Master quiz")
+    parser.add_argument("--web", action="store_true", help="serve the quiz to browsers instead of opening a window")
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=8550)
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS)
+    parser.add_argument("--bank", help="idiom file every web session starts with")
+    args = parser.parse_args()
+
+    if args.web:
+        registry = BankRegistry()
+        if args.bank:
+            registry.default_key, _ = registry.load(args.bank)
+        ft.app(target=serve(registry, args.max_sessions), view=ft.AppView.WEB_BROWSER, host=args.host, port=args.port)
+    else:
+        ft.app(target=main)
@@ -0,0 +1,106 @@
+import hashlib
+import time
+
+import numpy as np
+
+from arrayfile import StringTable, pack_strings, read_arrays, write_arrays
+from quizset import IdiomBank, QuizSet
+
+QUIZ_EXTENSION = ".quiz"
+FORMAT = "idiom-quiz"
+VERSION = 2  # 2: bank_hash, a plain content hash, replaces the cache's bank_key
+
+
+def _compact(codes, table):
+    # Keeps only the strings the quiz uses and renumbers the codes into them
+    used, remapped = np.unique(codes, return_inverse=True)
+    dtype = np.uint16 if len(used) <= 1 << 16 else np.int32
+    blob, offsets = pack_strings([table[c] for c in used.tolist()])
+    return blob, offsets, remapped.reshape(codes.shape).astype(dtype)
+
+
+def bank_hash(bank):
+    """SHA-1 of a bank's rows as text, the same whatever file, cache or version it came from."""
+    h = hashlib.sha1()
+    for table, codes in ((bank.idiom_table, bank.idiom_codes), (bank.meaning_table, bank.meaning_codes)):
+        blob, offsets = pack_strings(table)
+        h.update(blob.tobytes())
+        h.update(offsets.astype("<i8").tobytes())
+        h.update(np.asarray(codes).astype("<i8").tobytes())
+    return h.hexdigest()
+
+
+def save_quiz(path, quiz, bank_hash=None, seed=None, **settings):
+    """Writes a quiz as an array file: the strings it uses, its option and answer arrays,
+    and a JSON header with the source bank's hash and the seed it was generated from."""
+    idiom_blob, idiom_offsets, opt_idiom = _compact(quiz.opt_idiom, quiz.idioms)
+    meaning_blob, meaning_offsets, opt_meaning = _compact(quiz.opt_meaning, quiz.meanings)
+    write_arrays(path, {
+        "idiom_blob": idiom_blob,
+        "idiom_offsets": idiom_offsets,
+        "meaning_blob": meaning_blob,
+        "meaning_offsets": meaning_offsets,
+        "opt_idiom": opt_idiom,
+        "opt_meaning": opt_meaning,
+        "correct": quiz.correct.astype(np.int8, copy=False),
+    }, {
+        "format": FORMAT,
+        "version": VERSION,
+        "questions": len(quiz),
+        "bank_hash": bank_hash,
+        "seed": seed,
+        "settings": settings,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+
+
+def _table(arrays, name):
+    blob, offsets = arrays[f"{name}_blob"], arrays[f"{name}_offsets"]
+    if offsets.ndim != 1 or len(offsets) < 1 or offsets[0] != 0 or offsets[-1] != len(blob) or (np.diff(offsets) < 0).any():
+        raise ValueError(f"the quiz file's {name} strings are damaged")
+    return StringTable(blob, offsets)
+
+
+def _codes(arrays, name, table, n):
+    codes = arrays[name]
+    if codes.shape != (n, 4) or codes.dtype.kind not in "iu":
+        raise ValueError(f"the quiz file's {name} array is damaged")
+    if n and (codes.min() < 0 or codes.max() >= len(table)):
+        raise ValueError(f"the quiz file's {name} array points past its strings")
+    return codes
+
+
+def load_quiz(path):
+    """Returns (quiz, meta).  Strings are decoded on access, so this costs one file read.
+
+    Raises ValueError for anything that is not an intact quiz file, so a
+    damaged one fails here rather than in the middle of the quiz.
+    """
+    try:
+        arrays, meta = read_arrays(path)
+    except (KeyError, TypeError) as ex:
+        raise ValueError(f"not a readable quiz file ({ex})") from ex
+    if meta.get("format") != FORMAT:
+        raise ValueError("not a quiz file")
+    if meta.get("version", 0) > VERSION:
+        raise ValueError("the quiz file was written by a newer version of the app")
+    try:
+        idioms, meanings = _table(arrays, "idiom"), _table(arrays, "meaning")
+        correct = arrays["correct"]
+        n = len(correct)
+        if correct.ndim != 1 or (n and (correct.min() < 0 or correct.max() > 3)):
+            raise ValueError("the quiz file's answers are damaged")
+        opt_idiom = _codes(arrays, "opt_idiom", idioms, n)
+        opt_meaning = _codes(arrays, "opt_meaning", meanings, n)
+    except KeyError as ex:
+        raise ValueError(f"the quiz file has no {ex} array") from ex
+    if "bank_hash" not in meta:
+        meta["bank_hash"] = None  # version 1 stored a cache key, which is not comparable
+    return QuizSet(idioms, meanings, opt_idiom, opt_meaning, correct), meta
+
+
+def answer_bank(quiz):
+    """An IdiomBank of the quiz's correct pairs, over the quiz's own string tables."""
+    rows = np.arange(len(quiz))
+    return IdiomBank(quiz.idioms, quiz.opt_idiom[rows, quiz.correct],
+                     quiz.meanings, quiz.opt_meaning[rows, quiz.correct])
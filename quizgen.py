@@ -0,0 +1,197 @@
+import random
+
+import numpy as np
+
+from distractors import meaning_key
+from ingest import similar_pairs
+from quizset import QuizSet
+
+# random.shuffle() on a 4-item list makes three _randbelow(n) calls, for the
+# slots 3, 2 and 1.  Each call takes one 32-bit Mersenne Twister word, keeps
+# its top bit_length(n) bits and retries while the value is >= n.
+# (slot, n, shift)
+_SHUFFLE_STEPS = ((3, 4, 29), (2, 3, 30), (1, 2, 30))
+
+# Meaning pairs whose sketches are at least this close get the exact
+# near-duplicate check; every near-duplicate in testing scored above 0.65
+CLOSE_COSINE = 0.5
+CHECK_BATCH = 1 << 16
+
+
+def _mt_words(rng, count):
+    # getrandbits(32 * count) packs `count` consecutive MT outputs, first word lowest
+    raw = rng.getrandbits(32 * count).to_bytes(4 * count, "little")
+    return np.frombuffer(raw, dtype="<u4")
+
+
+def _next_accepted(accepted):
+    # nxt[i] = first j >= i with accepted[j]; two sentinel slots point past the end
+    size = len(accepted)
+    idx = np.where(accepted, np.arange(size), size)
+    nxt = np.minimum.accumulate(idx[::-1])[::-1]
+    return np.concatenate([nxt, [size, size]])
+
+
+def _shuffle_draws(rng, count):
+    """Replays `count` successive rng.shuffle() calls on 4-item lists.
+
+    Returns a (count, 3) array with the swap partner drawn for slots 3, 2, 1.
+    """
+    if count == 0:
+        return np.zeros((0, 3), dtype=np.intp)
+    words = _mt_words(rng, 6 * count + 64)
+    while True:
+        size = len(words)
+        nxt = [_next_accepted((words >> shift) < n) for _, n, shift in _SHUFFLE_STEPS]
+
+        # Word position where the next shuffle starts, given where this one starts
+        step = nxt[2][nxt[1][nxt[0][np.arange(size + 2)] + 1] + 1] + 1
+        step = np.minimum(step, size + 1)
+
+        # starts[q] = step applied q times to 0, by binary lifting
+        starts = np.zeros(count, dtype=np.intp)
+        q = np.arange(count)
+        jump = step
+        bit = 1
+        while bit < count:
+            sel = (q & bit) != 0
+            starts[sel] = jump[starts[sel]]
+            jump = jump[jump]
+            bit <<= 1
+
+        p0 = nxt[0][starts]
+        p1 = nxt[1][p0 + 1]
+        p2 = nxt[2][p1 + 1]
+        if p2[-1] < size:
+            break
+        words = np.concatenate([words, _mt_words(rng, size)])
+
+    return np.stack([words[p] >> shift for p, (_, _, shift) in zip((p0, p1, p2), _SHUFFLE_STEPS)], axis=1).astype(np.intp)
+
+
+def generate_indices(n_rows, seed=None):
+    """Builds a quiz as index arrays over a bank of `n_rows` idioms.
+
+    Returns (rows, correct): rows[q, c] is the bank row shown in option slot c
+    of question q and correct[q] is the slot holding the right answer.  For a
+    given seed this matches the row-by-row generator it replaces.
+    """
+    if n_rows < 4:
+        raise ValueError("Need at least 4 idioms to build a quiz")
+
+    if seed is not None:
+        order = np.random.RandomState(seed).permutation(n_rows)
+        rng = random.Random(seed)
+    else:
+        order = np.random.RandomState().permutation(n_rows)
+        rng = random.Random()
+
+    total = len(order)
+    n = -(-total // 4)
+    # The last chunk borrows from the start of the shuffled frame when short
+    chunks = order[(np.arange(n * 4) % total)].reshape(n, 4)
+
+    slots = np.tile(np.arange(4), (n, 1))
+    draws = _shuffle_draws(rng, n)
+    r = np.arange(n)
+    for s, (i, _, _) in enumerate(_SHUFFLE_STEPS):
+        j = draws[:, s]
+        swapped = slots[r, j]
+        slots[r, j] = slots[r, i]
+        slots[r, i] = swapped
+
+    rows = chunks[r[:, None], slots]
+    correct = np.argmin(slots, axis=1).astype(np.int8)
+    return rows, correct
+
+
+def _same_meaning(bank, index, targets, candidates):
+    # True where a candidate row's meaning is the target's in other words:
+    # the same meaning_key, or a near-duplicate as clean_bank counts them
+    a = bank.meaning_codes[targets][:, None]
+    b = bank.meaning_codes[np.maximum(candidates, 0)]
+    same = index.keys[a] == index.keys[b]
+    keys = {}  # meaning code -> meaning_key, as targets recur across their candidates
+
+    def key(code):
+        text = keys.get(code)
+        if text is None:
+            text = keys[code] = meaning_key(bank.meaning_table[code])
+        return text
+
+    for lo in range(0, len(targets), CHECK_BATCH):
+        va = index.vectors[a[lo:lo + CHECK_BATCH, 0]]
+        vb = index.vectors[b[lo:lo + CHECK_BATCH]]
+        close = (np.einsum("md,mkd->mk", va, vb) >= CLOSE_COSINE) & ~same[lo:lo + CHECK_BATCH]
+        q, c = np.nonzero(close)
+        if not len(q): continue
+        near = similar_pairs([key(m) for m in a[lo + q, 0].tolist()], [key(m) for m in b[lo + q, c].tolist()])
+        same[lo + q[near], c[near]] = True
+    return same
+
+
+def _use_close_distractors(bank, rows, correct, index):
+    # Swap each question's random wrong options for the idioms whose
+    # meanings are nearest to the correct one's
+    n = len(rows)
+    targets = rows[np.arange(n), correct]
+    first_row = np.full(len(bank.meaning_table), -1, dtype=np.int64)
+    first_row[bank.meaning_codes[::-1]] = np.arange(len(bank))[::-1]
+
+    near = index.neighbours(bank.meaning_codes[targets], k=3)
+    near_rows = np.where(near >= 0, first_row[np.maximum(near, 0)], -1)
+
+    wrong = np.ones((n, 4), dtype=bool)
+    wrong[np.arange(n), correct] = False
+    current = rows[wrong].reshape(n, 3)
+
+    # Neighbours first, then the random wrong rows as fillers; a candidate
+    # is usable unless it is missing, the target, means what the target
+    # means, or is already taken.  A question left with fewer than three
+    # keeps its random options.
+    candidates = np.concatenate([near_rows, current], axis=1)
+    usable = candidates >= 0
+    usable &= candidates != targets[:, None]
+    usable &= ~_same_meaning(bank, index, targets, candidates)
+    for c in range(1, candidates.shape[1]):
+        taken = (candidates[:, :c] == candidates[:, c:c + 1]) & usable[:, :c]
+        usable[:, c] &= ~taken.any(axis=1)
+    pick = np.argsort(~usable, axis=1, kind="stable")[:, :3]
+    chosen = np.take_along_axis(candidates, pick, axis=1)
+    short = usable.sum(axis=1) < 3
+    chosen[short] = current[short]
+    rows[wrong] = chosen.reshape(-1)
+
+
+def generate_for_targets(bank, targets, seed=None, index=None):
+    """Generates a QuizSet asking for the given bank rows, with random (or close) distractors."""
+    if len(bank) < 4:
+        raise ValueError("Need at least 4 idioms to build a quiz")
+    rs = np.random.RandomState(seed)
+    targets = np.asarray(targets, dtype=np.int64)
+    n = len(targets)
+    # Three distinct rows other than the target; redraw any question
+    # that picked the same row twice
+    chunks = np.column_stack([targets, np.zeros((n, 3), dtype=np.int64)])
+    redraw = np.arange(n)
+    while len(redraw):
+        others = rs.randint(0, len(bank) - 1, size=(len(redraw), 3))
+        others += others >= targets[redraw, None]
+        chunks[redraw, 1:] = others
+        s = np.sort(others, axis=1)
+        redraw = redraw[(s[:, 1:] == s[:, :-1]).any(axis=1)]
+
+    slots = np.argsort(rs.random_sample((n, 4)), axis=1)
+    rows = chunks[np.arange(n)[:, None], slots]
+    correct = np.argmin(slots, axis=1).astype(np.int8)
+    if index is not None:
+        _use_close_distractors(bank, rows, correct, index)
+    return QuizSet.from_indices(bank, rows, correct)
+
+
+def generate_quiz(bank, seed=None, index=None):
+    """Generates a QuizSet; with a SimilarityIndex over the bank's meanings the distractors are the closest ones."""
+    rows, correct = generate_indices(len(bank), seed=seed)
+    if index is not None:
+        _use_close_distractors(bank, rows, correct, index)
+    return QuizSet.from_indices(bank, rows, correct)
@@ -0,0 +1,188 @@
+import numpy as np
+
+LETTERS = ["A", "B", "C", "D"]
+
+
+def find_idiom_columns(columns):
+    idiom_col = next((c for c in columns if "idiom" in c.lower()), None)
+    meaning_col = next((c for c in columns if "meaning" in c.lower()), None)
+    if not idiom_col or not meaning_col: raise ValueError("Need 'idiom' and 'meaning' cols")
+    return idiom_col, meaning_col
+
+
+class StringInterner:
+    """Maps each distinct text to one table slot; values can be fed in chunks."""
+
+    def __init__(self):
+        self.table = []
+        self.index = {}
+
+    def add(self, values):
+        table, index = self.table, self.index
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            text = f"{value}"
+            code = index.get(text)
+            if code is None:
+                code = index[text] = len(table)
+                table.append(text)
+            codes[i] = code
+        return codes
+
+
+def intern_strings(values):
+    """Returns (table, codes): each distinct text stored once, plus one int32 code per value."""
+    interner = StringInterner()
+    codes = interner.add(values)
+    return interner.table, codes
+
+
+class IdiomBank:
+    """The idiom/meaning columns of a loaded file, as interned string tables."""
+
+    def __init__(self, idiom_table, idiom_codes, meaning_table, meaning_codes):
+        self.idiom_table = idiom_table
+        self.idiom_codes = idiom_codes
+        self.meaning_table = meaning_table
+        self.meaning_codes = meaning_codes
+        self.report = None  # what ingest.clean_bank removed, if it ran
+        self.drawn_from = None  # how ShardManifest.sample drew it, to draw it again
+        self._rows_by_idiom = None
+
+    @classmethod
+    def from_columns(cls, idioms, meanings):
+        return cls(*intern_strings(idioms), *intern_strings(meanings))
+
+    @classmethod
+    def from_frame(cls, df):
+        idiom_col, meaning_col = find_idiom_columns(df.columns)
+        return cls.from_columns(df[idiom_col].tolist(), df[meaning_col].tolist())
+
+    def __len__(self):
+        return len(self.idiom_codes)
+
+    def rows_by_idiom(self):
+        # First row holding each distinct idiom, built on first use
+        if self._rows_by_idiom is None:
+            first = np.full(len(self.idiom_table), -1, dtype=np.int64)
+            first[self.idiom_codes[::-1]] = np.arange(len(self))[::-1]
+            self._rows_by_idiom = dict(zip(self.idiom_table, first.tolist()))
+        return self._rows_by_idiom
+
+
+class BankBuilder:
+    """Builds an IdiomBank from row chunks without keeping the chunks around."""
+
+    def __init__(self):
+        self.idioms = StringInterner()
+        self.meanings = StringInterner()
+        self.idiom_codes = []
+        self.meaning_codes = []
+        self.rows = 0
+
+    def add(self, idioms, meanings):
+        self.idiom_codes.append(self.idioms.add(idioms))
+        self.meaning_codes.append(self.meanings.add(meanings))
+        self.rows += len(idioms)
+
+    def build(self):
+        empty = np.empty(0, dtype=np.int32)
+        return IdiomBank(
+            self.idioms.table,
+            np.concatenate(self.idiom_codes) if self.idiom_codes else empty,
+            self.meanings.table,
+            np.concatenate(self.meaning_codes) if self.meaning_codes else empty,
+        )
+
+
+class QuizSet:
+    """A generated quiz kept as parallel arrays instead of a DataFrame.
+
+    opt_idiom[q, c] / opt_meaning[q, c] index the string tables for option
+    slot c of question q, and correct[q] is the slot of the right answer.
+    Every accessor is a couple of array lookups, no row objects are built.
+    """
+
+    def __init__(self, idioms, meanings, opt_idiom, opt_meaning, correct):
+        self.idioms = idioms
+        self.meanings = meanings
+        self.opt_idiom = opt_idiom
+        self.opt_meaning = opt_meaning
+        self.correct = correct
+        # Plain list so hot loops compare against a str, not a numpy scalar
+        self.correct_letters = [LETTERS[c] for c in correct.tolist()]
+
+    @classmethod
+    def from_indices(cls, bank, rows, correct):
+        return cls(
+            bank.idiom_table,
+            bank.meaning_table,
+            bank.idiom_codes[rows],
+            bank.meaning_codes[rows],
+            correct.astype(np.int8, copy=False),
+        )
+
+    def __len__(self):
+        return len(self.correct)
+
+    def head(self, n):
+        """The first n questions as their own QuizSet."""
+        return QuizSet(self.idioms, self.meanings, self.opt_idiom[:n], self.opt_meaning[:n], self.correct[:n])
+
+    def question(self, i):
+        return self.meanings[self.opt_meaning[i, self.correct[i]]]
+
+    def option(self, i, char):
+        return self.idioms[self.opt_idiom[i, LETTERS.index(char)]]
+
+    def meaning(self, i, char):
+        return self.meanings[self.opt_meaning[i, LETTERS.index(char)]]
+
+    def correct_letter(self, i):
+        return self.correct_letters[i]
+
+    def to_frame(self):
+        import pandas as pd
+
+        idioms = np.array(self.idioms, dtype=object)
+        meanings = np.array(self.meanings, dtype=object)
+        targets = self.opt_meaning[np.arange(len(self)), self.correct]
+        data = {
+            "Question": meanings[targets],
+            "Correct Answer": np.array(self.correct_letters, dtype=object),
+        }
+        for c, char in enumerate(LETTERS):
+            data[f"Option {char}"] = idioms[self.opt_idiom[:, c]]
+            data[f"Meaning {char}"] = meanings[self.opt_meaning[:, c]]
+        return pd.DataFrame(data)
+
+
+class QuizStats:
+    """Running score for one quiz run, updated as answers and flags change."""
+
+    def __init__(self, total=0):
+        self.total = total
+        self.attempted = 0
+        self.correct = 0
+        self.marked = 0
+
+    @property
+    def wrong(self):
+        return self.attempted - self.correct
+
+    def record_answer(self, selection, correct_letter):
+        if selection is None: return
+        self.attempted += 1
+        if selection == correct_letter:
+            self.correct += 1
+
+    def record_flag(self, flagged):
+        self.marked += 1 if flagged else -1
+
+    @classmethod
+    def from_answers(cls, answers, correct_letters, flags):
+        stats = cls(len(answers))
+        for sel, ans in zip(answers, correct_letters):
+            stats.record_answer(sel, ans)
+        stats.marked = sum(flags)
+        return stats
@@ -0,0 +1,118 @@
+import functools
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+def _count_nodes(control):
+    # Controls in the subtree Flet diffs when `control` is updated; the
+    # payload is only the ones that changed, so this is an upper bound
+    count = 0
+    stack = [control]
+    while stack:
+        c = stack.pop()
+        count += 1
+        stack.extend(c._get_children() if hasattr(c, "_get_children") else ())
+    return count
+
+
+class RenderBatch:
+    """Collects the controls touched during one interaction and sends them in one update.
+
+    Handlers call touch() instead of control.update(); the outermost
+    interaction() flushes everything with a single page.update(*controls).
+    Batches are per thread, since Flet runs sync handlers on a thread pool
+    while timer ticks run on the event loop.
+
+    `totals` accumulates counts per interaction name: update calls sent,
+    controls passed to page.update and controls in their subtrees, which
+    Flet diffs (the bytes actually sent are measured by bench_app).
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.local = threading.local()
+        self.totals = {}
+
+    @contextmanager
+    def interaction(self, name):
+        state = self.local
+        depth = getattr(state, "depth", 0)
+        if depth == 0:
+            state.pending = {}
+            state.name = name
+        state.depth = depth + 1
+        try:
+            yield
+        finally:
+            state.depth -= 1
+            if state.depth == 0:
+                pending, state.pending = state.pending, {}
+                self._flush(state.name, pending.values())
+
+    def touch(self, *controls):
+        state = self.local
+        if getattr(state, "depth", 0) == 0:
+            self._flush("direct", controls)
+            return
+        for c in controls:
+            state.pending[id(c)] = c
+
+    def _flush(self, name, controls):
+        if any(c is self.page for c in controls):
+            targets = [self.page]
+        else:
+            targets = [c for c in controls if c.page is not None]
+
+        if targets:
+            if targets[0] is self.page:
+                self.page.update()
+            else:
+                self.page.update(*targets)
+
+        stats = {
+            "updates": 1 if targets else 0,
+            "controls": len(targets),
+            "diffed": sum(_count_nodes(c) for c in targets),
+        }
+        totals = self.totals.setdefault(name, {"interactions": 0, "updates": 0, "controls": 0, "diffed": 0})
+        totals["interactions"] += 1
+        for key, value in stats.items():
+            totals[key] += value
+
+
+class RenderCache:
+    """LRU map from a view's inputs to its finished render model.
+
+    Holds at most max_entries models, dropping the least recently used.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        model = self.entries.get(key)
+        if model is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return model
+        self.misses += 1
+        model = self.entries[key] = build(*key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return model
+
+    def clear(self):
+        self.entries.clear()
+
+
+def batched(method):
+    """Runs a QuizApp handler inside one render batch."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.render.interaction(method.__name__):
+            return method(self, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,23 @@
+class Scheduler:
+    """Named coroutines run on the page's event loop via page.run_task.
+
+    Starting a name that is already running cancels the old task first, so
+    there is never more than one countdown or auto-advance in flight.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.tasks = {}
+
+    def start(self, name, handler, *args):
+        self.cancel(name)
+        self.tasks[name] = self.page.run_task(handler, *args)
+
+    def cancel(self, name):
+        task = self.tasks.pop(name, None)
+        if task is not None:
+            task.cancel()
+
+    def cancel_all(self):
+        for name in list(self.tasks):
+            self.cancel(name)
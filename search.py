@@ -0,0 +1,108 @@
+import bisect
+import copy
+import re
+import threading
+
+import numpy as np
+
+_WORD = re.compile(r"\w+")
+_LAST = "\U0010ffff"  # sorts after every word with the same prefix
+
+
+def words(text):
+    return _WORD.findall(text.casefold())
+
+
+class SearchIndex:
+    """Word-prefix search over every idiom and meaning string added so far.
+
+    Each distinct string is one document.  add() only tokenizes strings it
+    has not seen, into a new segment: a sorted vocabulary with each word's
+    documents laid out contiguously, so the documents of every word
+    sharing a prefix are a single slice.  Loading another file therefore
+    indexes just its new strings and never rebuilds the existing ones.
+    """
+
+    def __init__(self):
+        self.doc_ids = {}   # text -> document id
+        self.segments = []  # (sorted words, offsets, documents)
+        self.docs = 0
+        self.lock = threading.Lock()
+
+    def add(self, texts):
+        """Returns the document id of each text, indexing the ones not seen before."""
+        with self.lock:
+            ids = np.empty(len(texts), dtype=np.int64)
+            postings = {}
+            for i, text in enumerate(texts):
+                doc = self.doc_ids.get(text)
+                if doc is None:
+                    doc = self.doc_ids[text] = len(self.doc_ids)
+                    for w in set(words(text)):
+                        postings.setdefault(w, []).append(doc)
+                ids[i] = doc
+            # The count grows before the segment appears, so a concurrent
+            # match() never sees a document past the end of its mask
+            self.docs = len(self.doc_ids)
+            if postings:
+                vocab = sorted(postings)
+                offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+                np.cumsum([len(postings[w]) for w in vocab], out=offsets[1:])
+                docs = np.fromiter((d for w in vocab for d in postings[w]), dtype=np.int64, count=offsets[-1])
+                self.segments.append((vocab, offsets, docs))
+            return ids
+
+    def match(self, query):
+        """Boolean mask over documents that have a word starting with each query word, or None for an empty query."""
+        terms = words(query)
+        if not terms: return None
+        segments = list(self.segments)
+        docs = self.docs
+        mask = None
+        for term in terms:
+            hit = np.zeros(docs, dtype=bool)
+            for vocab, offsets, postings in segments:
+                lo = bisect.bisect_left(vocab, term)
+                hi = bisect.bisect_left(vocab, term + _LAST, lo)
+                hit[postings[offsets[lo]:offsets[hi]]] = True
+            mask = hit if mask is None else mask & hit
+        return mask
+
+
+class QuizSearch:
+    """Searches one bank and the quiz generated from it, for review mode.
+
+    Questions match when any of their options' idioms or meanings does;
+    bank rows are listed too, unless their idiom is already an option in
+    the quiz.  Every lookup is a few array gathers over the whole set.
+    """
+
+    def __init__(self, index, bank):
+        self.index = index
+        self.bank = bank
+        idiom_docs = index.add(bank.idiom_table)
+        meaning_docs = index.add(bank.meaning_table)
+        self.idiom_docs = idiom_docs
+        self.meaning_docs = meaning_docs
+        self.row_idiom = idiom_docs[bank.idiom_codes]
+        self.row_meaning = meaning_docs[bank.meaning_codes]
+        self.quiz_idiom = self.quiz_meaning = None
+        self.row_outside = None
+
+    def for_quiz(self, quiz):
+        """A copy that also searches `quiz`, which must index this bank's string tables."""
+        view = copy.copy(self)
+        view.quiz_idiom = self.idiom_docs[quiz.opt_idiom]
+        view.quiz_meaning = self.meaning_docs[quiz.opt_meaning]
+        in_quiz = np.zeros(self.index.docs, dtype=bool)
+        in_quiz[view.quiz_idiom.ravel()] = True
+        view.row_outside = ~in_quiz[self.row_idiom]
+        return view
+
+    def search(self, query, limit):
+        """Returns (question indices, bank rows), each at most `limit` long."""
+        mask = self.index.match(query)
+        if mask is None: return [], []
+        questions = np.flatnonzero(mask[self.quiz_idiom].any(axis=1) | mask[self.quiz_meaning].any(axis=1))
+        rows = np.flatnonzero((mask[self.row_idiom] | mask[self.row_meaning]) & self.row_outside)
+        return questions[:limit].tolist(), rows[:limit].tolist()
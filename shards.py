@@ -0,0 +1,109 @@
+import bisect
+import hashlib
+import os
+import random
+import threading
+
+from bankcache import file_key
+from ingest import clean_bank
+from loader import load_bank
+from quizset import IdiomBank
+
+EXTENSIONS = (".csv", ".xlsx", ".xls")
+
+
+def bank_files(directory):
+    """Idiom files under `directory`, in a stable order."""
+    found = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        found.extend(os.path.join(root, f) for f in sorted(files) if f.lower().endswith(EXTENSIONS))
+    return found
+
+
+class ShardManifest:
+    """An idiom bank split over many files, indexed by row counts only.
+
+    Each shard is parsed once into the BankCache; the manifest keeps just
+    its path, cache key and row count.  sample() picks rows uniformly over
+    the whole set and reads only those rows, from memory-mapped shards.
+    Sampling every row always gives the same bank, so that one is merged
+    and cleaned once and then reused, from memory or the BankCache.  Other
+    samples are not cached: each records in `drawn_from` how to draw it
+    again, so a resumed quiz rebuilds its bank from the shards instead.
+    """
+
+    def __init__(self, cache, shards):
+        self.cache = cache
+        self.shards = shards  # [(path, key, rows)]
+        self.offsets = [0]
+        for _, _, rows in shards:
+            self.offsets.append(self.offsets[-1] + rows)
+        self.full = None  # (key, bank) of every row, once merged
+        self.full_lock = threading.Lock()
+
+    @classmethod
+    def build(cls, paths, cache, progress=None, cancel=None):
+        """Indexes the files; progress(done, total) is called after each one."""
+        shards = []
+        for done, path in enumerate(paths, 1):
+            key = file_key(path)
+            bank = cache.get(key, mmap=True)
+            if bank is None:
+                # Shards are cleaned on their own; small ones are fine here
+                bank = clean_bank(load_bank(path, cancel=cancel, clean=False), min_idioms=0)
+                cache.put(key, bank)
+            shards.append((path, key, len(bank)))
+            if progress: progress(done, len(paths))
+        return cls(cache, shards)
+
+    @property
+    def total(self):
+        return self.offsets[-1]
+
+    def sample(self, count, seed=None):
+        """Returns (key, bank) holding `count` rows drawn uniformly from every shard.
+
+        The rows are cleaned again as one bank, which drops duplicates
+        that came from different files.
+        """
+        if count >= self.total:
+            return self._sample_all()
+        if seed is None:
+            seed = random.randrange(1 << 32)  # a concrete one, so the draw can be repeated
+        rows = sorted(random.Random(seed).sample(range(self.total), count))
+        h = hashlib.sha1(",".join(key for _, key, _ in self.shards).encode())
+        h.update(",".join(map(str, rows)).encode())
+        bank = self._merge(rows)
+        bank.drawn_from = {"shards": [list(s) for s in self.shards], "count": count, "seed": seed}
+        return h.hexdigest(), bank
+
+    def _sample_all(self):
+        with self.full_lock:
+            if self.full is None:
+                key = hashlib.sha1((",".join(k for _, k, _ in self.shards) + ":all").encode()).hexdigest()
+                bank = self.cache.get(key, mmap=True)
+                if bank is None:
+                    bank = self._merge(range(self.total))
+                    try:
+                        self.cache.put(key, bank)
+                    except OSError:
+                        pass
+                bank.drawn_from = {"shards": [list(s) for s in self.shards], "count": self.total, "seed": None}
+                self.full = key, bank
+            return self.full
+
+    def _merge(self, rows):
+        # One cleaned bank of the given (sorted) manifest rows
+        idioms, meanings = [], []
+        for s, (_, key, _) in enumerate(self.shards):
+            lo = bisect.bisect_left(rows, self.offsets[s])
+            hi = bisect.bisect_left(rows, self.offsets[s + 1])
+            if lo == hi: continue
+            bank = self.cache.get(key, mmap=True)
+            if bank is None:
+                raise ValueError(f"{self.shards[s][0]} is no longer cached; select the files again")
+            local = [r - self.offsets[s] for r in rows[lo:hi]]
+            idioms.extend(bank.idiom_table[c] for c in bank.idiom_codes[local].tolist())
+            meanings.extend(bank.meaning_table[c] for c in bank.meaning_codes[local].tolist())
+        return clean_bank(IdiomBank.from_columns(idioms, meanings))
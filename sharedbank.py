@@ -0,0 +1,115 @@
+import threading
+from collections import OrderedDict
+
+from bankcache import BankCache, file_key
+from distractors import SimilarityIndex
+from loader import load_bank
+from search import QuizSearch, SearchIndex
+
+MAX_LOADS = 2  # files parsed or indexed at the same time
+MAX_BANKS = 8  # banks, indexes and searches each kept per process, least recently used out first
+
+
+class BankRegistry:
+    """Idiom banks shared read-only by every session of a web server.
+
+    A bank is parsed at most once per process, written to the BankCache and
+    then reopened memory-mapped, so all sessions (and server processes)
+    read the same pages and each session only holds its own quiz arrays.
+    Loads of the same file are coalesced, and at most `max_loads` files
+    are parsed at once however many sessions ask.  Only the `max_banks`
+    most recently used banks, indexes and searches are kept; sessions
+    still holding an evicted one keep using it, and the next session to
+    ask reopens it from the cache.
+    """
+
+    def __init__(self, cache=None, max_loads=MAX_LOADS, max_banks=MAX_BANKS):
+        self.cache = cache or BankCache()
+        self.max_banks = max_banks
+        self.banks = OrderedDict()
+        self.indexes = OrderedDict()
+        self.search_index = SearchIndex()
+        self.searches = OrderedDict()
+        self.default_key = None
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        self.load_slots = threading.BoundedSemaphore(max_loads)
+
+    def _key_lock(self, key):
+        with self.lock:
+            return self.key_locks.setdefault(key, threading.Lock())
+
+    def _recall(self, table, key):
+        with self.lock:
+            value = table.get(key)
+            if value is not None:
+                table.move_to_end(key)
+            return value
+
+    def _keep(self, table, key, value):
+        with self.lock:
+            table[key] = value
+            table.move_to_end(key)
+            while len(table) > self.max_banks:
+                table.popitem(last=False)
+                if table is self.searches:
+                    # The shared word index only grows, so searches built
+                    # from now on start a new one; the old one goes with
+                    # the last search that uses it
+                    self.search_index = SearchIndex()
+        return value
+
+    def get(self, key):
+        bank = self._recall(self.banks, key)
+        if bank is None and key:
+            with self._key_lock(key):
+                bank = self._recall(self.banks, key) or self.cache.get(key, mmap=True)
+                if bank is not None:
+                    self._keep(self.banks, key, bank)
+        return bank
+
+    def load(self, path, progress=None, cancel=None):
+        """Returns (key, bank) for the file, parsing it only if no session has yet."""
+        key = file_key(path)
+        bank = self.get(key)
+        if bank is not None:
+            return key, bank
+        with self._key_lock(key):
+            bank = self._recall(self.banks, key)
+            if bank is None:
+                with self.load_slots:
+                    parsed = load_bank(path, progress=progress, cancel=cancel)
+                try:
+                    self.cache.put(key, parsed)
+                    bank = self.cache.get(key, mmap=True)
+                except OSError:
+                    bank = None
+                bank = self._keep(self.banks, key, bank or parsed)
+        return key, bank
+
+    def index(self, key, bank):
+        index = self._recall(self.indexes, key)
+        if index is not None:
+            return index
+        with self._key_lock(key):
+            index = self._recall(self.indexes, key) or self.cache.get_index(key, len(bank.meaning_table), mmap=True)
+            if index is None:
+                with self.load_slots:
+                    index = SimilarityIndex.build(bank.meaning_table)
+                try:
+                    self.cache.put_index(key, index)
+                except OSError:
+                    pass
+            self._keep(self.indexes, key, index)
+        return index
+
+    def search(self, key, bank):
+        search = self._recall(self.searches, key)
+        if search is not None:
+            return search
+        with self._key_lock(key):
+            search = self._recall(self.searches, key)
+            if search is None:
+                with self.load_slots:
+                    search = self._keep(self.searches, key, QuizSearch(self.search_index, bank))
+        return search
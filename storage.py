@@ -0,0 +1,13 @@
+import os
+
+
+def storage_path(*parts, cache=False):
+    """A path under the app's own directory.
+
+    Flet sets FLET_APP_STORAGE_DATA for packaged apps; otherwise this is the
+    usual per-user data directory, or the cache directory for files that
+    can be rebuilt.
+    """
+    fallback = (".cache",) if cache else (".local", "share")
+    base = os.getenv("FLET_APP_STORAGE_DATA") or os.path.join(os.path.expanduser("~"), *fallback)
+    return os.path.join(base, "idiom-quiz", *parts)
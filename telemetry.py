@@ -0,0 +1,164 @@
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from storage import storage_path
+
+CAPACITY = 4096          # events kept between exports
+MIN_MS = 0.001
+DECADES = 10             # histograms cover MIN_MS up to ~2.8 hours
+BUCKETS_PER_DECADE = 20  # ~12% bucket width, so percentiles are within ~6%
+N_BUCKETS = DECADES * BUCKETS_PER_DECADE + 1
+
+
+def default_telemetry_path():
+    return storage_path("telemetry.jsonl")
+
+
+class LatencyHistogram:
+    """Streaming percentiles from log-spaced bucket counts, in fixed memory."""
+
+    def __init__(self):
+        self.counts = np.zeros(N_BUCKETS, dtype=np.int64)
+        self.total = 0.0
+        self.max = 0.0
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def add_many(self, ms):
+        ms = np.asarray(ms, dtype=np.float64)
+        if not len(ms): return
+        with np.errstate(divide="ignore", invalid="ignore"):
+            buckets = np.floor(np.log10(ms / MIN_MS) * BUCKETS_PER_DECADE) + 1
+        buckets = np.clip(np.nan_to_num(buckets, nan=0, neginf=0), 0, N_BUCKETS - 1).astype(np.intp)
+        self.counts += np.bincount(buckets, minlength=N_BUCKETS)
+        self.total += float(ms.sum())
+        self.max = max(self.max, float(ms.max()))
+
+    def percentile(self, q):
+        count = self.count
+        if not count: return None
+        i = int(np.searchsorted(np.cumsum(self.counts), q / 100 * count))
+        if i == 0: return MIN_MS
+        # Geometric middle of the bucket, never above the largest sample
+        return min(MIN_MS * 10 ** ((i - 0.5) / BUCKETS_PER_DECADE), self.max)
+
+    def summary(self):
+        count = self.count
+        return {
+            "count": count,
+            "mean_ms": self.total / count if count else None,
+            "p50_ms": self.percentile(50),
+            "p90_ms": self.percentile(90),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max,
+        }
+
+
+class Telemetry:
+    """Handler latency and per-question think time, kept in a fixed-size ring buffer.
+
+    record() takes no lock: it draws a ticket from a counter and stores
+    one tuple in the ticket's slot, overwriting the oldest event once the
+    buffer is full.  Every half lap the older half of the buffer is folded
+    into per-metric histograms, so percentiles cover every event while
+    the hot path stays a few hundred nanoseconds.  export() appends the
+    events since the last export, plus a summary line of percentiles per
+    metric, to a local JSONL file.
+    """
+
+    def __init__(self, capacity=CAPACITY, path=None, session=None):
+        self.capacity = capacity
+        self.half = max(capacity // 2, 1)
+        self.ring = [None] * capacity  # (ticket, monotonic time, name, ms, question index)
+        self.tickets = itertools.count()
+        self.folded = 0
+        self.exported = 0
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.path = path or default_telemetry_path()
+        self.session = session
+
+    def record(self, name, ms, index=None, t=None):
+        ticket = next(self.tickets)
+        if ticket and ticket % self.half == 0:
+            # Before this write can overwrite anything unfolded
+            self._fold(ticket - self.half)
+        self.ring[ticket % self.capacity] = (ticket, time.monotonic() if t is None else t, name, ms, index)
+
+    def _events(self, lo, hi):
+        lo = max(lo, hi - self.capacity)
+        events = []
+        for ticket in range(lo, hi):
+            e = self.ring[ticket % self.capacity]
+            if e is not None and e[0] == ticket:  # skips a slot still being written
+                events.append(e)
+        return events
+
+    def _fold(self, upto):
+        with self.lock:
+            if upto <= self.folded: return
+            by_name = {}
+            for _, _, name, ms, _ in self._events(self.folded, upto):
+                by_name.setdefault(name, []).append(ms)
+            self.folded = upto
+            for name, values in by_name.items():
+                hist = self.histograms.get(name)
+                if hist is None:
+                    hist = self.histograms[name] = LatencyHistogram()
+                hist.add_many(values)
+
+    def _latest(self):
+        e = max((e for e in self.ring if e is not None), default=None, key=lambda e: e[0])
+        return 0 if e is None else e[0] + 1
+
+    def summary(self):
+        self._fold(self._latest())
+        with self.lock:
+            return {name: hist.summary() for name, hist in self.histograms.items()}
+
+    def export(self):
+        end = self._latest()
+        self._fold(end)
+        with self.lock:
+            start = max(self.exported, end - self.capacity)
+            dropped = start - self.exported
+            events = self._events(start, end)
+            self.exported = end
+            metrics = {name: hist.summary() for name, hist in self.histograms.items()}
+
+        lines = [
+            json.dumps({"session": self.session, "t": t, "event": name, "ms": round(ms, 4), "q": q})
+            for _, t, name, ms, q in events
+        ]
+        # Monotonic stamps above map to wall time through this pair
+        lines.append(json.dumps({
+            "session": self.session, "summary": metrics, "dropped": dropped,
+            "monotonic": time.monotonic(), "wall": time.time(),
+        }))
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def timed(method):
+    """Records a QuizApp handler's run time under its name."""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        # perf_counter for the duration: monotonic() ticks every ~16 ms on Windows
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            self.telemetry.record(name, ms, t=time.monotonic())
+    return wrapper